@@ -70,6 +70,22 @@ remove_files() {
     echo_success "\tdevice.json does not exist in $CONFIG_DIR"
   fi
 
+  # Remove state.jsonl if it exists
+  if [ -f "$CONFIG_DIR/state.jsonl" ]; then
+    rm "$CONFIG_DIR/state.jsonl"
+    echo_success "\tRemoved state.jsonl."
+  else
+    echo_success "\tstate.jsonl does not exist in $CONFIG_DIR"
+  fi
+
+  # Remove plugin_manifest.json if it exists
+  if [ -f "$CONFIG_DIR/plugin_manifest.json" ]; then
+    rm "$CONFIG_DIR/plugin_manifest.json"
+    echo_success "\tRemoved plugin_manifest.json."
+  else
+    echo_success "\tplugin_manifest.json does not exist in $CONFIG_DIR"
+  fi
+
   # Remove plugins.json if it exists
   if [ -f "$CONFIG_DIR/plugins.json" ]; then
     rm "$CONFIG_DIR/plugins.json"
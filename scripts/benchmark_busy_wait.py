@@ -0,0 +1,61 @@
+"""Benchmarks waiting for an e-paper panel's BUSY line, on a SimulatedPin instead of a panel.
+
+Compares the drivers' polling loops, reading the line and sleeping between reads or spinning on it, with
+the edge triggered wait epdconfig.wait_busy uses. Latency is the time from the line's release to the wait
+returning, CPU is the process time spent per wait. Runs on any Linux box, from the repository root:
+
+    python scripts/benchmark_busy_wait.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from display.waveshare_epd.busy_wait import SimulatedPin
+
+BUSY_LEVEL = 0
+BUSY_MS = [20, 100, 500]
+ITERATIONS = 10
+# added to every busy time, so releases do not line up with the polling interval
+JITTER_MS = 10
+TIMEOUT_SECONDS = 5
+
+def sleep_poll(pin, delay_ms):
+    while pin.value == BUSY_LEVEL:
+        time.sleep(delay_ms / 1000.0)
+
+def spin(pin):
+    while pin.value == BUSY_LEVEL:
+        pass
+
+def edge_wait(pin):
+    pin.wait_for_value(1 - BUSY_LEVEL, TIMEOUT_SECONDS)
+
+WAITS = [
+    ("poll, delay_ms(10)", lambda pin: sleep_poll(pin, 10)),
+    ("poll, delay_ms(5)", lambda pin: sleep_poll(pin, 5)),
+    ("spin", spin),
+    ("edge wait", edge_wait)
+]
+
+def main():
+    print(f"{'busy (ms)':<11}{'wait':<20}{'mean latency (ms)':>19}{'max latency (ms)':>18}{'CPU per wait (ms)':>19}")
+    for busy_ms in BUSY_MS:
+        for name, wait in WAITS:
+            pin = SimulatedPin(1 - BUSY_LEVEL)
+            latencies, cpu_seconds = [], 0.0
+            rng = random.Random(busy_ms)
+            for _ in range(ITERATIONS):
+                pin.pulse(BUSY_LEVEL, (busy_ms + rng.uniform(0, JITTER_MS)) / 1000.0)
+                cpu_start = time.process_time()
+                wait(pin)
+                returned = time.perf_counter()
+                cpu_seconds += time.process_time() - cpu_start
+                latencies.append(returned - pin.last_edge_time)
+            print(f"{busy_ms:<11}{name:<20}{sum(latencies) / ITERATIONS * 1000:>19.2f}{max(latencies) * 1000:>18.2f}"
+                  f"{cpu_seconds / ITERATIONS * 1000:>19.2f}")
+
+if __name__ == "__main__":
+    main()
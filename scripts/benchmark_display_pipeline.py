@@ -0,0 +1,85 @@
+"""Benchmarks the display post-processing against the previous step-by-step pipeline.
+
+Compares orientation, crop and resize, inversion and enhancement done one step at a time (the previous
+DisplayManager.display_image) with transform_image and apply_image_enhancement, at 800x480 and 1600x1200.
+Peak memory is measured as the growth of the maximum RSS of a fresh interpreter running each pipeline.
+Run from the repository root:
+
+    python scripts/benchmark_display_pipeline.py
+"""
+import os
+import sys
+import json
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+RESOLUTIONS = [(800, 480), (1600, 1200)]
+CASES = [
+    ("horizontal", False, {}),
+    ("horizontal", False, {"brightness": 1.1, "contrast": 1.2}),
+    ("vertical", True, {"brightness": 1.1, "contrast": 1.2, "saturation": 1.3, "sharpness": 1.5}),
+]
+ITERATIONS = 30
+
+RUN_PIPELINE = """
+import sys, json, time, resource
+from PIL import Image, ImageEnhance, ImageDraw
+from utils.image_utils import change_orientation, resize_image, transform_image, apply_image_enhancement
+
+pipeline, width, height, orientation, inverted, image_settings, iterations = json.loads(sys.argv[1])
+
+def step_by_step(image):
+    image = change_orientation(image, orientation)
+    image = resize_image(image, (width, height))
+    if inverted:
+        image = image.rotate(180)
+    image = ImageEnhance.Brightness(image).enhance(image_settings.get("brightness", 1.0))
+    image = ImageEnhance.Contrast(image).enhance(image_settings.get("contrast", 1.0))
+    image = ImageEnhance.Color(image).enhance(image_settings.get("saturation", 1.0))
+    image = ImageEnhance.Sharpness(image).enhance(image_settings.get("sharpness", 1.0))
+    return image
+
+def fused(image):
+    image = transform_image(image, (width, height), orientation=orientation, inverted=inverted)
+    return apply_image_enhancement(image, image_settings)
+
+# a plugin renders at the display resolution, swapped for vertical orientation
+size = (height, width) if orientation == "vertical" else (width, height)
+image = Image.new("RGB", size, "white")
+draw = ImageDraw.Draw(image)
+for x in range(0, size[0], 40):
+    draw.line((x, 0, size[0] - x, size[1]), fill=(x % 256, 80, 160), width=3)
+
+process = step_by_step if pipeline == "step_by_step" else fused
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+process(image)
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+start = time.perf_counter()
+for _ in range(iterations):
+    process(image)
+seconds = (time.perf_counter() - start) / iterations
+print(json.dumps({"seconds": seconds, "peak_kb": peak_kb}))
+"""
+
+def run(pipeline, resolution, orientation, inverted, image_settings):
+    args = json.dumps([pipeline, *resolution, orientation, inverted, image_settings, ITERATIONS])
+    result = subprocess.run(
+        [sys.executable, "-c", RUN_PIPELINE, args],
+        cwd=SRC_DIR, env=dict(os.environ, SRC_DIR=SRC_DIR), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+def main():
+    print(f"{'resolution':<12}{'orientation':<13}{'inverted':<10}{'enhanced':<10}"
+          f"{'before (ms)':>12}{'after (ms)':>12}{'speedup':>9}{'before peak (KB)':>18}{'after peak (KB)':>17}")
+    for resolution in RESOLUTIONS:
+        for orientation, inverted, image_settings in CASES:
+            before = run("step_by_step", resolution, orientation, inverted, image_settings)
+            after = run("fused", resolution, orientation, inverted, image_settings)
+            print(f"{'x'.join(map(str, resolution)):<12}{orientation:<13}{str(inverted):<10}{str(bool(image_settings)):<10}"
+                  f"{before['seconds'] * 1000:>12.1f}{after['seconds'] * 1000:>12.1f}{before['seconds'] / max(after['seconds'], 1e-4):>8.1f}x"
+                  f"{before['peak_kb']:>18}{after['peak_kb']:>17}")
+
+if __name__ == "__main__":
+    main()
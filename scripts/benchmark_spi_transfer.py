@@ -0,0 +1,60 @@
+"""Benchmarks sending frame buffers over SPI, with a FakeSpiDev recording the transfers instead of a panel.
+
+Compares the previous paths, a single writebytes2 call with the list a driver's getbuffer returns and the
+byte per call loop of the software SPI variant, with the bulk transfers of spi_transfer.write_bulk at the
+default and a raised spidev buffer size. Host time is the time spent in Python and the fake's byte
+conversion, wire time is what the bus takes at each SPI clock speed. Runs on any Linux box, from the
+repository root:
+
+    python scripts/benchmark_spi_transfer.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from display.waveshare_epd.spi_transfer import FakeSpiDev, write_bulk
+
+FRAMES = [
+    ("800x480 1 bit", 800 * 480 // 8),
+    ("800x480 4 bit colour", 800 * 480 // 2),
+    ("1600x1200 4 bit colour", 1600 * 1200 // 2)
+]
+SPEEDS_HZ = [4000000, 8000000, 16000000, 32000000]
+ITERATIONS = 5
+
+def byte_per_call(spi, frame, frame_list):
+    for i in range(len(frame)):
+        spi.writebytes([frame[i]])
+
+def bulk_write(spi, frame, bufsiz):
+    write_bulk(spi.writebytes2, frame, bufsiz=bufsiz)
+
+PATHS = [
+    ("writebytes2(list)", lambda spi, frame, frame_list: spi.writebytes2(frame_list)),
+    ("byte per call", byte_per_call),
+    ("bulk, bufsiz 4096", lambda spi, frame, frame_list: bulk_write(spi, frame, 4096)),
+    ("bulk, bufsiz 65536", lambda spi, frame, frame_list: bulk_write(spi, frame, 65536))
+]
+
+def main():
+    print(f"{'frame':<24}{'path':<20}{'calls':>8}{'host (ms)':>11}"
+          + "".join(f"{f'wire @{speed // 1000000}MHz (ms)':>20}" for speed in SPEEDS_HZ))
+    for name, size in FRAMES:
+        # the drivers' getbuffer returns a list, the vectorized packers a bytearray
+        frame = bytearray(os.urandom(size))
+        frame_list = list(frame)
+        for path_name, send in PATHS:
+            spi = FakeSpiDev()
+            start = time.perf_counter()
+            for _ in range(ITERATIONS):
+                send(spi, frame, frame_list)
+            host_seconds = (time.perf_counter() - start) / ITERATIONS
+            stats = spi.get_stats()
+            assert stats["bytes"] == size * ITERATIONS
+            wire = "".join(f"{stats['bytes'] / ITERATIONS * 8 / speed * 1000:>20.1f}" for speed in SPEEDS_HZ)
+            print(f"{name:<24}{path_name:<20}{stats['calls'] // ITERATIONS:>8}{host_seconds * 1000:>11.1f}{wire}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Reports the cold import cost of each plugin module.
+
+Every plugin is imported in a fresh interpreter, so the numbers include all of its dependencies and do
+not depend on which plugins were imported before it. Run from the repository root:
+
+    python scripts/plugin_import_report.py
+"""
+import os
+import sys
+import json
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+PLUGINS_DIR = os.path.join(SRC_DIR, "plugins")
+
+MEASURE_IMPORT = """
+import sys, json, time, importlib, psutil
+process = psutil.Process()
+rss_before = process.memory_info().rss
+modules_before = len(sys.modules)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({
+    "import_seconds": time.perf_counter() - start,
+    "rss_delta_mb": (process.memory_info().rss - rss_before) / (1024 * 1024),
+    "modules": len(sys.modules) - modules_before
+}))
+"""
+
+def measure(plugin_id):
+    env = dict(os.environ, SRC_DIR=SRC_DIR)
+    # the baseline the app has already imported by the time a plugin is loaded
+    result = subprocess.run(
+        [sys.executable, "-c", "import plugins.base_plugin.base_plugin\n" + MEASURE_IMPORT, f"plugins.{plugin_id}.{plugin_id}"],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout)
+
+def main():
+    plugin_ids = sorted(
+        plugin for plugin in os.listdir(PLUGINS_DIR)
+        if os.path.isfile(os.path.join(PLUGINS_DIR, plugin, "plugin-info.json"))
+    )
+    report = {plugin_id: measure(plugin_id) for plugin_id in plugin_ids}
+
+    print(f"{'plugin':<20}{'import (s)':>12}{'rss (MB)':>10}{'modules':>9}")
+    for plugin_id, cost in sorted(report.items(), key=lambda item: item[1].get("import_seconds", -1), reverse=True):
+        if "error" in cost:
+            print(f"{plugin_id:<20}  failed: {cost['error']}")
+        else:
+            print(f"{plugin_id:<20}{cost['import_seconds']:>12.3f}{cost['rss_delta_mb']:>10.1f}{cost['modules']:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Verifies the vectorized frame buffer packers byte for byte against the Waveshare drivers' packing.
+
+The reference functions below are the getbuffer loops of the Waveshare e-Paper library (epd7in5_V2 and
+the 7-colour epd7in3f/epd7in3e drivers), which are downloaded at install time and so not part of this
+repository. Every layout is checked in the panel orientation and rotated, with photographic noise and
+drawn shapes, and the time of both implementations is printed.
+Run from the repository root:
+
+    python scripts/verify_framebuffer_packing.py
+"""
+import os
+import sys
+import time
+import random
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from display.waveshare_epd.framebuffer import (pack_1bit, pack_4bit_color,
+                                               ACEP_7COLOR_PALETTE, SPECTRA_6COLOR_PALETTE)
+
+def reference_1bit_inverted(image, width, height):
+    if image.size == (width, height):
+        image = image.convert('1')
+    else:
+        image = image.rotate(90, expand=True).convert('1')
+    buf = bytearray(image.tobytes('raw'))
+    for i in range(len(buf)):
+        buf[i] ^= 0xFF
+    return buf
+
+def reference_7color(image, width, height, palette):
+    pal_image = Image.new("P", (1, 1))
+    pal_image.putpalette(palette + (0, 0, 0) * 249)
+    if image.size == (width, height):
+        image_temp = image
+    else:
+        image_temp = image.rotate(90, expand=True)
+    image_7color = image_temp.convert("RGB").quantize(palette=pal_image)
+    buf_7color = bytearray(image_7color.tobytes('raw'))
+    buf = [0x00] * int(width * height / 2)
+    idx = 0
+    for i in range(0, len(buf_7color), 2):
+        buf[idx] = (buf_7color[i] << 4) + buf_7color[i + 1]
+        idx += 1
+    return buf
+
+CASES = [
+    ("1 bit, epd7in5_V2", 800, 480, reference_1bit_inverted, lambda image, width, height: pack_1bit(image, width, height, invert=True)),
+    ("4 bit 7-colour, epd7in3f", 800, 480, lambda image, width, height: reference_7color(image, width, height, ACEP_7COLOR_PALETTE),
+     lambda image, width, height: pack_4bit_color(image, width, height, ACEP_7COLOR_PALETTE)),
+    ("4 bit 6-colour, epd7in3e", 800, 480, lambda image, width, height: reference_7color(image, width, height, SPECTRA_6COLOR_PALETTE),
+     lambda image, width, height: pack_4bit_color(image, width, height, SPECTRA_6COLOR_PALETTE)),
+]
+
+def make_images(size, seed):
+    rng = random.Random(seed)
+    noise = Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+    drawn = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(drawn)
+    for _ in range(40):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        fill = rng.choice([(0, 0, 0), (255, 255, 255), (192, 192, 192), (128, 128, 128), (255, 0, 0), (0, 128, 255)])
+        draw.rectangle((x, y, x + rng.randrange(1, 120), y + rng.randrange(1, 80)), fill=fill)
+        draw.text((y % size[0], x % size[1]), "12:34", fill=(0, 0, 0))
+    gradient = Image.linear_gradient("L").resize(size).convert("RGB")
+    return [noise, drawn, gradient]
+
+def main():
+    failures = 0
+    print(f"{'layout':<28}{'orientation':<13}{'result':<10}{'reference (ms)':>16}{'vectorized (ms)':>17}")
+    for seed, (name, width, height, reference, packer) in enumerate(CASES):
+        for orientation, size in (("panel", (width, height)), ("rotated", (height, width))):
+            reference_seconds, packer_seconds, matches = 0.0, 0.0, True
+            for image in make_images(size, seed):
+                start = time.perf_counter()
+                expected = bytes(reference(image.copy(), width, height))
+                reference_seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                actual = bytes(packer(image, width, height))
+                packer_seconds += time.perf_counter() - start
+                matches = matches and actual == expected
+            failures += not matches
+            print(f"{name:<28}{orientation:<13}{'ok' if matches else 'MISMATCH':<10}"
+                  f"{reference_seconds * 1000 / 3:>16.1f}{packer_seconds * 1000 / 3:>17.1f}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
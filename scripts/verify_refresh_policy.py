@@ -0,0 +1,104 @@
+"""Verifies the Waveshare refresh policy decisions for 1 bit, 4 bit colour and driver packed frame buffers.
+
+Drives WaveshareDisplay with recording stand-ins for the panel drivers, which are downloaded at install time
+and so not part of this repository, and checks which updates are preceded by a Clear(). Small changes must
+only clear once the update budget runs out, whatever the buffer layout, and large changes must clear when
+the layout lets the change be measured. Run from the repository root:
+
+    python scripts/verify_refresh_policy.py
+"""
+import os
+import sys
+import types
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from display.waveshare_epd.simulated import install_simulated_epdconfig
+from display.waveshare_display import WaveshareDisplay
+
+# no panel hardware, the registered colour drivers load epdconfig for their busy waits
+install_simulated_epdconfig()
+
+class RecordingEPD:
+    """Records the Clear() and display() calls of a driver."""
+    width = 800
+    height = 480
+
+    def __init__(self):
+        self.calls = []
+
+    def init(self):
+        pass
+
+    def Clear(self):
+        self.calls.append("Clear")
+
+    def display(self, image):
+        self.calls.append("display")
+
+    def sleep(self):
+        pass
+
+class DriverPackedEPD(RecordingEPD):
+    """A driver whose own getbuffer returns a 4 bit list, as the unregistered colour drivers do."""
+
+    def getbuffer(self, image):
+        pixels = image.convert("L").tobytes()
+        return [(pixels[i] >> 4 << 4) | (pixels[i + 1] >> 4) for i in range(0, len(pixels), 2)]
+
+class OneBitEPD(RecordingEPD):
+    def getbuffer(self, image):
+        return bytearray(image.convert("1").tobytes())
+
+class Config:
+    def __init__(self, display_type):
+        self.config = {"display_type": display_type, "resolution": [800, 480]}
+
+    def get_config(self, key=None, default=None):
+        return self.config.get(key, default)
+
+def register_driver(display_type, epd_class):
+    module = types.ModuleType(f"display.waveshare_epd.{display_type}")
+    module.EPD = epd_class
+    sys.modules[module.__name__] = module
+
+def make_frame(index, large=False):
+    image = Image.new("RGB", (800, 480), "white")
+    draw = ImageDraw.Draw(image)
+    if large:
+        draw.rectangle((0, 0, 800, 400), fill="red" if index % 2 else "blue")
+    draw.text((100, 100), f"{index:02d}:00", fill="black")
+    return image
+
+def get_clears(display_type, epd_class, large=False, updates=6):
+    register_driver(display_type, epd_class)
+    display = WaveshareDisplay(Config(display_type))
+    clears = []
+    for index in range(updates):
+        display.epd_display.calls.clear()
+        display.display_image(make_frame(index, large))
+        clears.append("Clear" in display.epd_display.calls)
+    return clears
+
+CASES = [
+    # layout, display type, driver, large changes, expected Clear() per update with the default budget of 5
+    ("1 bit", "fake1bit", OneBitEPD, False, [True, False, False, False, False, True]),
+    ("4 bit colour, epd7in3e", "epd7in3e", RecordingEPD, False, [True, False, False, False, False, True]),
+    ("4 bit colour, epd7in3e", "epd7in3e", RecordingEPD, True, [True, True, True, True, True, True]),
+    ("4 bit, driver getbuffer", "fakedriver4bit", DriverPackedEPD, False, [True, False, False, False, False, True]),
+]
+
+def main():
+    failures = 0
+    for layout, display_type, epd_class, large, expected in CASES:
+        clears = get_clears(display_type, epd_class, large)
+        matches = clears == expected
+        failures += not matches
+        print(f"{layout:<26}{'large' if large else 'small'} changes  {'ok' if matches else 'MISMATCH'}  "
+              f"clears: {''.join('C' if clear else '.' for clear in clears)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify, current_app, render_template, send_file, make_response
+from flask import Blueprint, request, jsonify, current_app, render_template, send_file, make_response, Response
+from utils.metrics import generate_latest
 import os
 
 main_bp = Blueprint("main", __name__)
@@ -28,4 +29,9 @@ def current_image():
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     
-    return response
\ No newline at end of file
+    return response
+
+@main_bp.route('/metrics')
+def metrics():
+    """Serve refresh pipeline metrics in the Prometheus text format"""
+    return Response(generate_latest(), mimetype='text/plain; version=0.0.4')
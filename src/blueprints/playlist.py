@@ -5,11 +5,15 @@ from datetime import datetime, timedelta
 import os
 import logging
 from utils.app_utils import resolve_path, handle_request_files, parse_form
+from refresh_task import PlaylistRefresh
 
 
 logger = logging.getLogger(__name__)
 playlist_bp = Blueprint("playlist", __name__)
 
+# share of the plugin cycle interval a refresh may take before the playlist page warns about it
+CYCLE_BUDGET_RATIO = 0.5
+
 @playlist_bp.route('/add_plugin', methods=['POST'])
 def add_plugin():
     device_config = current_app.config['DEVICE_CONFIG']
@@ -51,6 +55,11 @@ def add_plugin():
                 return jsonify({"error": "Refresh time is required"}), 400
             refresh_config = {"scheduled": refresh_time}
 
+        # optional per-instance override of plugin_render_deadline_seconds
+        render_deadline = refresh_settings.get('renderDeadline')
+        if render_deadline:
+            refresh_config["render_deadline"] = int(render_deadline)
+
         plugin_settings.update(handle_request_files(request.files))
         plugin_dict = {
             "plugin_id": plugin_id,
@@ -58,11 +67,18 @@ def add_plugin():
             "plugin_settings": plugin_settings,
             "name": instance_name
         }
-        result = playlist_manager.add_plugin_to_playlist(playlist, plugin_dict)
-        if not result:
-            return jsonify({"error": "Failed to add to playlist"}), 500
-
-        device_config.write_config()
+        with device_config.lock:
+            # checked again in case another request added it while the uploaded files were saved
+            existing = playlist_manager.find_plugin(plugin_id, instance_name)
+            if existing:
+                return jsonify({"error": f"Plugin instance '{instance_name}' already exists"}), 400
+
+            result = playlist_manager.add_plugin_to_playlist(playlist, plugin_dict)
+            if not result:
+                return jsonify({"error": "Failed to add to playlist"}), 500
+
+            device_config.write_config()
+        refresh_task.signal_playlist_change(playlist)
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     return jsonify({"success": True, "message": "Scheduled refresh configured."})
@@ -73,15 +89,21 @@ def playlists():
     playlist_manager = device_config.get_playlist_manager()
     refresh_info = device_config.get_refresh_info()
 
+    with device_config.lock:
+        playlist_config = playlist_manager.to_dict()
+        budget_warnings = get_budget_warnings(device_config, playlist_manager)
+
     return render_template(
         'playlist.html',
-        playlist_config=playlist_manager.to_dict(),
-        refresh_info=refresh_info.to_dict()
+        playlist_config=playlist_config,
+        refresh_info=refresh_info.to_dict(),
+        budget_warnings=budget_warnings
     )
 
 @playlist_bp.route('/create_playlist', methods=['POST'])
 def create_playlist():
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     data = request.json
@@ -97,16 +119,18 @@ def create_playlist():
         return jsonify({"error": "End time must be greater than start time"}), 400
 
     try:
-        playlist = playlist_manager.get_playlist(playlist_name)
-        if playlist:
-            return jsonify({"error": f"Playlist with name '{playlist_name}' already exists"}), 400
+        with device_config.lock:
+            playlist = playlist_manager.get_playlist(playlist_name)
+            if playlist:
+                return jsonify({"error": f"Playlist with name '{playlist_name}' already exists"}), 400
 
-        result = playlist_manager.add_playlist(playlist_name, start_time, end_time)
-        if not result:
-            return jsonify({"error": "Failed to create playlist"}), 500
+            result = playlist_manager.add_playlist(playlist_name, start_time, end_time)
+            if not result:
+                return jsonify({"error": "Failed to create playlist"}), 500
 
-        # save changes to device config file
-        device_config.write_config()
+            # save changes to device config file
+            device_config.write_config()
+        refresh_task.signal_playlist_change(playlist_name)
 
     except Exception as e:
         logger.exception("EXCEPTION CAUGHT: " + str(e))
@@ -118,6 +142,7 @@ def create_playlist():
 @playlist_bp.route('/update_playlist/<string:playlist_name>', methods=['PUT'])
 def update_playlist(playlist_name):
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     data = request.get_json()
@@ -130,31 +155,36 @@ def update_playlist(playlist_name):
     if end_time <= start_time:
         return jsonify({"error": "End time must be greater than start time"}), 400
     
-    playlist = playlist_manager.get_playlist(playlist_name)
-    if not playlist:
-        return jsonify({"error": f"Playlist '{playlist_name}' does not exist"}), 400
+    with device_config.lock:
+        playlist = playlist_manager.get_playlist(playlist_name)
+        if not playlist:
+            return jsonify({"error": f"Playlist '{playlist_name}' does not exist"}), 400
 
-    result = playlist_manager.update_playlist(playlist_name, new_name, start_time, end_time)
-    if not result:
-        return jsonify({"error": "Failed to delete playlist"}), 500
-    device_config.write_config()
+        result = playlist_manager.update_playlist(playlist_name, new_name, start_time, end_time)
+        if not result:
+            return jsonify({"error": "Failed to delete playlist"}), 500
+        device_config.write_config()
+    refresh_task.signal_playlist_change(playlist_name, new_name)
 
     return jsonify({"success": True, "message": f"Updated playlist '{playlist_name}'!"})
 
 @playlist_bp.route('/delete_playlist/<string:playlist_name>', methods=['DELETE'])
 def delete_playlist(playlist_name):
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     if not playlist_name:
         return jsonify({"error": f"Playlist name is required"}), 400
     
-    playlist = playlist_manager.get_playlist(playlist_name)
-    if not playlist:
-        return jsonify({"error": f"Playlist '{playlist_name}' does not exist"}), 400
+    with device_config.lock:
+        playlist = playlist_manager.get_playlist(playlist_name)
+        if not playlist:
+            return jsonify({"error": f"Playlist '{playlist_name}' does not exist"}), 400
 
-    playlist_manager.delete_playlist(playlist_name)
-    device_config.write_config()
+        playlist_manager.delete_playlist(playlist_name)
+        device_config.write_config()
+    refresh_task.signal_playlist_change(playlist_name)
 
     return jsonify({"success": True, "message": f"Deleted playlist '{playlist_name}'!"})
 
@@ -190,3 +220,27 @@ def format_relative_time(iso_date_string):
         return "yesterday at " + dt.strftime(time_format).lstrip("0")
     else:
         return dt.strftime(month_day_format).replace(" 0", " ")  # Removes leading zero in day
+
+
+def get_budget_warnings(device_config, playlist_manager):
+    """Returns warnings for plugin instances whose 95th percentile durations threaten the refresh cycle.
+
+    Keyed by 'playlist/plugin_id/instance name'. An instance is flagged if its render usually misses the
+    render deadline, or if rendering and displaying it takes a large share of the plugin cycle interval.
+    """
+    cycle_interval = device_config.get_config("plugin_cycle_interval_seconds", default=3600)
+    warnings = {}
+    for playlist in playlist_manager.playlists:
+        for plugin_instance in playlist.plugins:
+            render_p95 = plugin_instance.render_duration.get_p95()
+            if render_p95 is None:
+                continue
+            deadline = PlaylistRefresh(playlist, plugin_instance).get_render_deadline(device_config)
+            total_p95 = render_p95 + (plugin_instance.display_duration.get_p95() or 0)
+
+            key = f"{playlist.name}/{plugin_instance.plugin_id}/{plugin_instance.name}"
+            if deadline and render_p95 > deadline:
+                warnings[key] = f"Rendering often exceeds the {deadline}s render deadline"
+            elif total_p95 > cycle_interval * CYCLE_BUDGET_RATIO:
+                warnings[key] = f"Refreshing takes over {int(CYCLE_BUDGET_RATIO * 100)}% of the plugin cycle interval"
+    return warnings
@@ -49,6 +49,7 @@ def image(plugin_id, filename):
 @plugin_bp.route('/delete_plugin_instance', methods=['POST'])
 def delete_plugin_instance():
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     data = request.json
@@ -57,16 +58,18 @@ def delete_plugin_instance():
     plugin_instance = data.get("plugin_instance")
 
     try:
-        playlist = playlist_manager.get_playlist(playlist_name)
-        if not playlist:
-            return jsonify({"success": False, "message": "Playlist not found"}), 400
+        with device_config.lock:
+            playlist = playlist_manager.get_playlist(playlist_name)
+            if not playlist:
+                return jsonify({"success": False, "message": "Playlist not found"}), 400
 
-        result = playlist.delete_plugin(plugin_id, plugin_instance)
-        if not result:
-            return jsonify({"success": False, "message": "Plugin instance not found"}), 400
+            result = playlist.delete_plugin(plugin_id, plugin_instance)
+            if not result:
+                return jsonify({"success": False, "message": "Plugin instance not found"}), 400
 
-        # save changes to device config file
-        device_config.write_config()
+            # save changes to device config file
+            device_config.write_config()
+        refresh_task.signal_playlist_change(playlist_name)
 
     except Exception as e:
         logger.exception("EXCEPTION CAUGHT: " + str(e))
@@ -77,6 +80,7 @@ def delete_plugin_instance():
 @plugin_bp.route('/update_plugin_instance/<string:instance_name>', methods=['PUT'])
 def update_plugin_instance(instance_name):
     device_config = current_app.config['DEVICE_CONFIG']
+    refresh_task = current_app.config['REFRESH_TASK']
     playlist_manager = device_config.get_playlist_manager()
 
     try:
@@ -88,12 +92,14 @@ def update_plugin_instance(instance_name):
         plugin_settings.update(handle_request_files(request.files, request.form))
 
         plugin_id = plugin_settings.pop("plugin_id")
-        plugin_instance = playlist_manager.find_plugin(plugin_id, instance_name)
-        if not plugin_instance:
-            return jsonify({"error": f"Plugin instance: {instance_name} does not exist"}), 500
-
-        plugin_instance.settings = plugin_settings
-        device_config.write_config()
+        with device_config.lock:
+            plugin_instance = playlist_manager.find_plugin(plugin_id, instance_name)
+            if not plugin_instance:
+                return jsonify({"error": f"Plugin instance: {instance_name} does not exist"}), 500
+
+            plugin_instance.settings = plugin_settings
+            device_config.write_config()
+        refresh_task.signal_config_change()
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     return jsonify({"success": True, "message": f"Updated plugin instance {instance_name}."})
@@ -110,19 +116,20 @@ def display_plugin_instance():
     plugin_instance_name = data.get("plugin_instance")
 
     try:
-        playlist = playlist_manager.get_playlist(playlist_name)
-        if not playlist:
-            return jsonify({"success": False, "message": f"Playlist {playlist_name} not found"}), 400
+        with device_config.lock:
+            playlist = playlist_manager.get_playlist(playlist_name)
+            if not playlist:
+                return jsonify({"success": False, "message": f"Playlist {playlist_name} not found"}), 400
 
-        plugin_instance = playlist.find_plugin(plugin_id, plugin_instance_name)
-        if not plugin_instance:
-            return jsonify({"success": False, "message": f"Plugin instance '{plugin_instance_name}' not found"}), 400
+            plugin_instance = playlist.find_plugin(plugin_id, plugin_instance_name)
+            if not plugin_instance:
+                return jsonify({"success": False, "message": f"Plugin instance '{plugin_instance_name}' not found"}), 400
 
-        refresh_task.manual_update(PlaylistRefresh(playlist, plugin_instance, force=True))
+        job = refresh_task.manual_update(PlaylistRefresh(playlist, plugin_instance, force=True))
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
-    return jsonify({"success": True, "message": "Display updated"}), 200
+    return jsonify({"success": True, "message": "Display update queued", "job_id": job.job_id}), 202
 
 @plugin_bp.route('/update_now', methods=['POST'])
 def update_now():
@@ -134,8 +141,18 @@ def update_now():
         plugin_settings.update(handle_request_files(request.files))
         plugin_id = plugin_settings.pop("plugin_id")
 
-        refresh_task.manual_update(ManualRefresh(plugin_id, plugin_settings))
+        job = refresh_task.manual_update(ManualRefresh(plugin_id, plugin_settings))
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
-    return jsonify({"success": True, "message": "Display updated"}), 200
\ No newline at end of file
+    return jsonify({"success": True, "message": "Display update queued", "job_id": job.job_id}), 202
+
+@plugin_bp.route('/refresh_job/<string:job_id>')
+def refresh_job_status(job_id):
+    refresh_task = current_app.config['REFRESH_TASK']
+
+    job = refresh_task.get_job(job_id)
+    if not job:
+        return jsonify({"error": f"Refresh job '{job_id}' not found"}), 404
+
+    return jsonify(job.to_dict())
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app, render_template, Response
 from cysystemd.reader import JournalReader, JournalOpenMode, Rule
 from utils.time_utils import calculate_seconds
+from plugins.plugin_registry import get_import_report
 from datetime import datetime, timedelta
 import os
 import pytz
@@ -33,7 +34,6 @@ def save_settings():
             return jsonify({"error": "Time Zone is required"}), 400
         if not time_format or time_format not in ["12h", "24h"]:
             return jsonify({"error": "Time format is required"}), 400
-        previous_interval_seconds = device_config.get_config("plugin_cycle_interval_seconds")
         plugin_cycle_interval_seconds = calculate_seconds(int(interval), unit)
         if plugin_cycle_interval_seconds > 86400 or plugin_cycle_interval_seconds <= 0:
             return jsonify({"error": "Plugin cycle interval must be less than 24 hours"}), 400
@@ -54,17 +54,31 @@ def save_settings():
             }
         }
         device_config.update_config(settings)
+        # pick up API keys saved to the .env file without waiting for the file watcher
+        device_config.reload_secrets()
 
-        if plugin_cycle_interval_seconds != previous_interval_seconds:
-            # wake the background thread up to signal interval config change
-            refresh_task = current_app.config['REFRESH_TASK']
-            refresh_task.signal_config_change()
+        # wake the background thread up to signal the config change (e.g. interval or orientation updated)
+        refresh_task = current_app.config['REFRESH_TASK']
+        refresh_task.signal_config_change()
     except RuntimeError as e:
         return jsonify({"error": str(e)}), 500
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     return jsonify({"success": True, "message": "Saved settings."})
 
+@settings_bp.route('/system_stats')
+def system_stats():
+    stats_sampler = current_app.config['SYSTEM_STATS']
+    since = request.args.get('since', type=float)
+    return jsonify({
+        "interval_seconds": stats_sampler.interval_seconds,
+        "samples": stats_sampler.get_samples(since)
+    })
+
+@settings_bp.route('/plugin_import_report')
+def plugin_import_report():
+    return jsonify({"plugins": get_import_report()})
+
 @settings_bp.route('/shutdown', methods=['POST'])
 def shutdown():
     data = request.get_json() or {}
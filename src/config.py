@@ -1,18 +1,34 @@
 import os
 import json
 import logging
-from dotenv import load_dotenv
+import threading
 from model import PlaylistManager, RefreshInfo
+from config_persister import ConfigPersister, DEFAULT_WRITE_DELAY_SECONDS, write_atomic
+from state_journal import StateJournal, DEFAULT_COMPACT_THRESHOLD
+from utils.secret_store import SecretStore, DEFAULT_POLL_SECONDS
 
 logger = logging.getLogger(__name__)
 
 class Config:
+    """Device configuration and the playlist model.
+
+    The config dict is never modified in place. Writers build a new version and publish it with
+    compare_and_swap, so readers get a consistent version without locking. The playlist model objects
+    are mutable and are guarded by lock, held by anything that mutates them or iterates over them.
+    """
+
     # Base path for the project directory
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
     # File paths relative to the script's directory
     config_file = os.path.join(BASE_DIR, "config", "device.json")
 
+    # Journal of the runtime state that changes on every refresh, kept out of the config file
+    state_file = os.path.join(BASE_DIR, "config", "state.jsonl")
+
+    # Cache of the parsed plugin-info.json files
+    plugin_manifest_file = os.path.join(BASE_DIR, "config", "plugin_manifest.json")
+
     # File path for storing the current image being displayed
     current_image_file = os.path.join(BASE_DIR, "static", "images", "current_image.png")
 
@@ -20,10 +36,35 @@ class Config:
     plugin_image_dir = os.path.join(BASE_DIR, "static", "images", "plugins")
 
     def __init__(self):
+        self.lock = threading.RLock()
+        self.publish_lock = threading.Lock()
+        # orders the state journal writes of the refresh thread and the background writer, see write_state
+        self.state_write_lock = threading.Lock()
+        self.state_version = 0
+        self.written_state_version = 0
         self.config = self.read_config()
         self.plugins_list = self.read_plugins_list()
+        self.plugins_by_id = {plugin['id']: plugin for plugin in self.plugins_list}
         self.playlist_manager = self.load_playlist_manager()
         self.refresh_info = self.load_refresh_info()
+        self.persister = ConfigPersister(
+            self.config_file,
+            lambda: self.config,
+            delay_seconds=self.get_config("config_write_delay_seconds", default=DEFAULT_WRITE_DELAY_SECONDS),
+            write_state=self.write_state
+        )
+        self.secret_store = SecretStore(
+            poll_seconds=self.get_config("secrets_poll_seconds", default=DEFAULT_POLL_SECONDS)
+        )
+        self.state_journal = StateJournal(
+            self.state_file,
+            compact_threshold=self.get_config("state_journal_compact_threshold", default=DEFAULT_COMPACT_THRESHOLD)
+        )
+        if self.state_journal.state:
+            self.load_state()
+        else:
+            # first start with the journal, the runtime state so far was read from the config file
+            self.write_state()
 
     def read_config(self):
         """Reads the device config JSON file and returns it as a dictionary."""
@@ -36,29 +77,144 @@ class Config:
         return config
 
     def read_plugins_list(self):
-        """Reads the plugin-info.json config JSON from each plugin folder. Excludes the base plugin."""
+        """Reads the plugin-info.json config JSON from each plugin folder. Excludes the base plugin.
+
+        The parsed files are cached in the plugin manifest, a file is only parsed again if its
+        modification time or size changed.
+        """
+        manifest = self.read_plugin_manifest()
+        updated_manifest = {}
+
         # Iterate over all plugin folders
         plugins_list = []
         for plugin in sorted(os.listdir(os.path.join(self.BASE_DIR, "plugins"))):
             plugin_path = os.path.join(self.BASE_DIR, "plugins", plugin)
-            if os.path.isdir(plugin_path) and plugin != "__pycache__":
-                # Check if the plugin-info.json file exists
-                plugin_info_file = os.path.join(plugin_path, "plugin-info.json")
-                if os.path.isfile(plugin_info_file):
-                    logger.debug(f"Reading plugin info from {plugin_info_file}")
-                    with open(plugin_info_file) as f:
-                        plugin_info = json.load(f)
-                    plugins_list.append(plugin_info)
+            if plugin == "__pycache__":
+                continue
+            # Check if the plugin-info.json file exists
+            plugin_info_file = os.path.join(plugin_path, "plugin-info.json")
+            try:
+                stat = os.stat(plugin_info_file)
+            except OSError:
+                continue
+
+            file_id = [stat.st_mtime_ns, stat.st_size]
+            cached = manifest.get(plugin)
+            if cached and cached["file_id"] == file_id:
+                plugin_info = cached["plugin_info"]
+            else:
+                logger.debug(f"Reading plugin info from {plugin_info_file}")
+                with open(plugin_info_file) as f:
+                    plugin_info = json.load(f)
+            updated_manifest[plugin] = {"file_id": file_id, "plugin_info": plugin_info}
+            plugins_list.append(plugin_info)
 
+        if updated_manifest != manifest:
+            self.write_plugin_manifest(updated_manifest)
         return plugins_list
 
+    def read_plugin_manifest(self):
+        """Reads the cached plugin-info.json configs, returns an empty manifest if there is none."""
+        try:
+            with open(self.plugin_manifest_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_plugin_manifest(self, manifest):
+        """Writes the cached plugin-info.json configs, the manifest is only an optimization so failures are ignored."""
+        try:
+            write_atomic(self.plugin_manifest_file, json.dumps(manifest))
+        except OSError as e:
+            logger.warning(f"Failed to write plugin manifest. | path: {self.plugin_manifest_file}, error: {e}")
+
     def write_config(self):
-        """Updates the cached config from the model objects and writes to the config file."""
-        logger.debug(f"Writing device config to {self.config_file}")
-        self.update_value("playlist_config", self.playlist_manager.to_dict())
-        self.update_value("refresh_info", self.refresh_info.to_dict())
-        with open(self.config_file, 'w') as outfile:
-            json.dump(self.config, outfile, indent=4)
+        """Updates the cached config from the model objects and schedules a write to the config file.
+
+        The runtime state is written to the state journal instead, see write_state.
+
+        The file and the journal are written on a background thread once config_write_delay_seconds have
+        passed, so several changes in quick succession result in a single write and callers do not wait on disk.
+        """
+        with self.lock:
+            self.publish({"playlist_config": self.get_playlist_config()}, removed_keys=("refresh_info",))
+        self.persister.mark_dirty()
+        # instances added, renamed or removed change the keys of the runtime state
+        self.persister.mark_state_dirty()
+
+    def get_playlist_config(self):
+        """Returns the playlist configuration to store in the config file, without the runtime state."""
+        playlist_config = self.playlist_manager.to_dict(include_state=False)
+        for playlist in playlist_config["playlists"]:
+            for plugin in playlist["plugins"]:
+                state_settings = self.get_state_settings(plugin["plugin_id"])
+                if state_settings:
+                    plugin["plugin_settings"] = {key: value for key, value in plugin["plugin_settings"].items() if key not in state_settings}
+        return playlist_config
+
+    def get_state_settings(self, plugin_id):
+        """Returns the plugin settings the plugin updates as it renders, listed as state_settings in its plugin-info.json."""
+        plugin_config = self.get_plugin(plugin_id) or {}
+        return plugin_config.get("state_settings", [])
+
+    def get_state(self):
+        """Returns the runtime state of the refresh info, playlists and plugin instances, by key."""
+        state = {("refresh_info",): self.refresh_info.to_dict()}
+        for playlist in self.playlist_manager.playlists:
+            state[("playlist", playlist.name, "current_plugin_index")] = playlist.current_plugin_index
+            for plugin_instance in playlist.plugins:
+                instance_key = (playlist.name, plugin_instance.plugin_id, plugin_instance.name)
+                for field, value in plugin_instance.get_state().items():
+                    state[("plugin_instance", *instance_key, field)] = value
+                for setting in self.get_state_settings(plugin_instance.plugin_id):
+                    if setting in plugin_instance.settings:
+                        state[("plugin_setting", *instance_key, setting)] = plugin_instance.settings[setting]
+        return state
+
+    def write_state(self):
+        """Appends the runtime state that changed since the last write to the state journal.
+
+        Only takes the model lock to read the state, the journal is appended to and synced after releasing it.
+        A state read before one that was already written is skipped, the newer one includes its changes.
+        """
+        with self.lock:
+            state = self.get_state()
+            self.state_version += 1
+            version = self.state_version
+        with self.state_write_lock:
+            if version < self.written_state_version:
+                return
+            self.state_journal.update(state)
+            self.written_state_version = version
+
+    def load_state(self):
+        """Restores the runtime state from the state journal onto the model objects."""
+        for key, value in self.state_journal.items():
+            kind = key[0]
+            if kind == "refresh_info":
+                self.refresh_info = RefreshInfo.from_dict(value)
+                continue
+
+            playlist = self.playlist_manager.get_playlist(key[1])
+            if not playlist:
+                continue
+            if kind == "playlist":
+                playlist.current_plugin_index = value
+                continue
+
+            plugin_instance = playlist.find_plugin(key[2], key[3])
+            if not plugin_instance:
+                continue
+            if kind == "plugin_instance":
+                plugin_instance.set_state(key[4], value)
+            elif kind == "plugin_setting":
+                plugin_instance.settings[key[4]] = value
+
+    def flush_config(self):
+        """Writes pending config changes to the config file immediately and stops the background writer, e.g. on shutdown."""
+        logger.debug(f"Flushing device config to {self.config_file}")
+        self.write_state()
+        self.persister.stop()
 
     def get_config(self, key=None, default={}):
         """Gets the value of a specific configuration key or returns the entire config if none provided."""
@@ -72,7 +228,7 @@ class Config:
 
     def get_plugin(self, plugin_id):
         """Finds and returns a plugin config by its ID."""
-        return next((plugin for plugin in self.plugins_list if plugin['id'] == plugin_id), None)
+        return self.plugins_by_id.get(plugin_id)
 
     def get_resolution(self):
         """Returns the display resolution as a tuple (width, height) from the configuration."""
@@ -82,19 +238,40 @@ class Config:
 
     def update_config(self, config):
         """Updates the config with the new values provided and writes to the config file."""
-        self.config.update(config)
+        self.publish(config)
         self.write_config()
 
     def update_value(self, key, value, write=False):
         """Updates a specific key in the configuration with a new value and optionally writes it to the config file."""
-        self.config[key] = value
+        self.publish({key: value})
         if write:
             self.write_config()
 
+    def publish(self, changes, removed_keys=()):
+        """Publishes a new version of the config with the changes applied, retrying if another writer published first."""
+        while True:
+            current = self.config
+            new_config = {**current, **changes}
+            for key in removed_keys:
+                new_config.pop(key, None)
+            if self.compare_and_swap(current, new_config):
+                return new_config
+
+    def compare_and_swap(self, expected, new_config):
+        """Replaces the config with new_config if it is still the expected version, returns whether it was replaced."""
+        with self.publish_lock:
+            if self.config is not expected:
+                return False
+            self.config = new_config
+            return True
+
     def load_env_key(self, key):
-        """Loads an environment variable using dotenv and returns its value."""
-        load_dotenv(override=True)
-        return os.getenv(key)
+        """Returns a secret from the cached .env file, falling back to the environment."""
+        return self.secret_store.get(key)
+
+    def reload_secrets(self):
+        """Re-reads the .env file, e.g. after API keys were saved."""
+        self.secret_store.reload()
 
     def load_playlist_manager(self):
         """Loads the playlist manager object from the config."""
@@ -114,3 +291,58 @@ class Config:
     def get_refresh_info(self):
         """Returns the refresh information."""
         return self.refresh_info
+
+    def snapshot(self):
+        """Returns a picklable, read-only view of the current config version, e.g. for a refresh cycle or a worker process."""
+        # published versions are never modified, so the snapshot can share the dict
+        return ConfigSnapshot(self.config, self.plugins_list, self.secret_store.get_all())
+
+class ConfigSnapshot:
+    """Read-only view of one version of the device config, passed to plugins when generating images.
+
+    Provides the subset of the Config interface plugins use when generating images.
+
+    Attributes:
+        config (dict): A published version of the device configuration.
+        plugins_list (list): The plugin-info.json configurations.
+        secrets (dict): Copy of the cached .env secrets.
+    """
+
+    config_file = Config.config_file
+    current_image_file = Config.current_image_file
+    plugin_image_dir = Config.plugin_image_dir
+
+    def __init__(self, config, plugins_list, secrets):
+        self.config = config
+        self.plugins_list = plugins_list
+        self.secrets = secrets
+        self.plugins_by_id = {plugin['id']: plugin for plugin in plugins_list}
+
+    def get_config(self, key=None, default={}):
+        """Gets the value of a specific configuration key or returns the entire config if none provided."""
+        if key is not None:
+            return self.config.get(key, default)
+        return self.config
+
+    def get_plugins(self):
+        """Returns the list of plugin configurations."""
+        return self.plugins_list
+
+    def get_plugin(self, plugin_id):
+        """Finds and returns a plugin config by its ID."""
+        return self.plugins_by_id.get(plugin_id)
+
+    def get_resolution(self):
+        """Returns the display resolution as a tuple (width, height) from the configuration."""
+        width, height = self.get_config("resolution")
+        return (int(width), int(height))
+
+    def load_env_key(self, key):
+        """Returns a secret from the copied .env secrets, falling back to the environment."""
+        if key in self.secrets:
+            return self.secrets[key]
+        return os.getenv(key)
+
+    def snapshot(self):
+        """Returns the snapshot itself, it is already read-only."""
+        return self
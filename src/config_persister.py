@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITE_DELAY_SECONDS = 2
+
+class ConfigPersister:
+    """Writes a JSON document to disk on a background thread, coalescing changes.
+
+    Callers mark the document dirty, the writer waits for the delay so changes made in quick succession
+    produce a single write, then serializes the current document and replaces the file atomically. The
+    runtime state can be marked dirty the same way, it is then written with write_state on the same thread.
+
+    Attributes:
+        path (str): File the document is written to.
+        get_document (callable): Returns the object to serialize, called on the writer thread.
+        delay_seconds (float): Coalescing window, a write happens at most this long after the first change.
+        write_state (callable): Writes the runtime state, called on the writer thread after mark_state_dirty.
+    """
+
+    def __init__(self, path, get_document, delay_seconds=DEFAULT_WRITE_DELAY_SECONDS, write_state=None):
+        self.path = path
+        self.get_document = get_document
+        self.delay_seconds = delay_seconds
+        self.write_state = write_state
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.dirty_since = None
+        self.document_dirty = False
+        self.state_dirty = False
+        self.running = False
+        self.thread = None
+
+    def mark_dirty(self):
+        """Schedules a write of the document, or writes it immediately if there is no coalescing window."""
+        self._schedule(document=True)
+
+    def mark_state_dirty(self):
+        """Schedules a write of the runtime state, or writes it immediately if there is no coalescing window."""
+        self._schedule(state=True)
+
+    def flush(self):
+        """Writes pending changes now, e.g. on shutdown."""
+        with self.condition:
+            document_dirty, state_dirty = self._take_dirty()
+        self._write_dirty(document_dirty, state_dirty)
+
+    def stop(self):
+        """Stops the writer thread after writing pending changes."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+
+    def write(self):
+        """Serializes the document and replaces the file atomically."""
+        with self.write_lock:
+            data = json.dumps(self.get_document(), indent=4)
+            write_atomic(self.path, data)
+            logger.debug(f"Wrote {self.path}")
+
+    def _schedule(self, document=False, state=False):
+        if not self.delay_seconds or self.delay_seconds <= 0:
+            self._write_dirty(document, state)
+            return
+
+        with self.condition:
+            self.document_dirty = self.document_dirty or document
+            self.state_dirty = self.state_dirty or state
+            if self.dirty_since is None:
+                self.dirty_since = time.monotonic()
+            if not self.running:
+                self.running = True
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def _take_dirty(self):
+        """Returns and clears the (document, state) dirty flags, must hold the condition."""
+        dirty = (self.document_dirty, self.state_dirty)
+        self.dirty_since = None
+        self.document_dirty = False
+        self.state_dirty = False
+        return dirty
+
+    def _write_dirty(self, document_dirty, state_dirty):
+        if state_dirty and self.write_state:
+            self.write_state()
+        if document_dirty:
+            self.write()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.dirty_since is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                remaining = self.dirty_since + self.delay_seconds - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(timeout=remaining)
+                    continue
+                document_dirty, state_dirty = self._take_dirty()
+            try:
+                self._write_dirty(document_dirty, state_dirty)
+            except Exception:
+                logger.exception(f"Failed to write {self.path}")
+
+def write_atomic(path, data):
+    """Writes data to a temp file next to path, fsyncs it and renames it over path.
+
+    Readers and a power loss see either the old or the new file, never a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -2,7 +2,8 @@ import fnmatch
 import json
 import logging
 
-from utils.image_utils import resize_image, change_orientation, apply_image_enhancement
+from utils.image_utils import transform_image, apply_image_enhancement
+from utils.metrics import REFRESH_STAGE_SECONDS
 from display.inky_display import InkyDisplay
 from display.waveshare_display import WaveshareDisplay
 
@@ -42,7 +43,7 @@ class DisplayManager:
         else:
             raise ValueError(f"Unsupported display type: {display_type}")
 
-    def display_image(self, image, image_settings=[]):
+    def display_image(self, image, image_settings=[], metric_labels={}):
         
         """
         Delegates image rendering to the appropriate display instance.
@@ -50,6 +51,7 @@ class DisplayManager:
         Args:
             image (PIL.Image): The image to be displayed.
             image_settings (list, optional): List of settings to modify image rendering.
+            metric_labels (dict, optional): Plugin id and instance labels for the stage timings.
 
         Raises:
             ValueError: If no valid display instance is found.
@@ -62,11 +64,18 @@ class DisplayManager:
         logger.info(f"Saving image to {self.device_config.current_image_file}")
         image.save(self.device_config.current_image_file)
 
-        # Resize and adjust orientation
-        image = change_orientation(image, self.device_config.get_config("orientation"))
-        image = resize_image(image, self.device_config.get_resolution(), image_settings)
-        if self.device_config.get_config("inverted_image"): image = image.rotate(180)
-        image = apply_image_enhancement(image, self.device_config.get_config("image_settings"))
+        # Adjust orientation, crop, resize and invert in a single resample
+        with REFRESH_STAGE_SECONDS.time(stage="transform", **metric_labels):
+            image = transform_image(
+                image,
+                self.device_config.get_resolution(),
+                orientation=self.device_config.get_config("orientation"),
+                inverted=bool(self.device_config.get_config("inverted_image")),
+                image_settings=image_settings
+            )
+        with REFRESH_STAGE_SECONDS.time(stage="enhancement", **metric_labels):
+            image = apply_image_enhancement(image, self.device_config.get_config("image_settings"))
 
         # Pass to the concrete instance to render to the device.
-        self.display.display_image(image, image_settings)
\ No newline at end of file
+        with REFRESH_STAGE_SECONDS.time(stage="driver", **metric_labels):
+            self.display.display_image(image, image_settings)
\ No newline at end of file
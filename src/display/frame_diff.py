@@ -0,0 +1,69 @@
+from PIL import Image, ImageChops
+
+# unchanged rows between two changed regions before they get separate boxes
+DEFAULT_MIN_ROW_GAP = 32
+# more boxes than this are merged into one, every partial update costs a panel refresh
+DEFAULT_MAX_BOXES = 4
+
+def get_row_stride(width):
+    """Returns the bytes per row of a 1-bit frame buffer, rows are padded to whole bytes."""
+    return (width + 7) // 8
+
+def get_dirty_boxes(previous_buffer, buffer, width, height, min_row_gap=DEFAULT_MIN_ROW_GAP, max_boxes=DEFAULT_MAX_BOXES):
+    """Compares two 1-bit frame buffers and returns the (left, top, right, bottom) pixel boxes that changed.
+
+    Buffers are compared byte by byte, so boxes are aligned to the 8 pixel columns of a byte and to rows,
+    the units the panel controllers address. Changed rows closer than min_row_gap are grouped into one box.
+    Returns an empty list if nothing changed, and None if the buffers do not have the expected layout.
+    """
+    stride = get_row_stride(width)
+    if previous_buffer is None or len(previous_buffer) != stride * height or len(buffer) != stride * height:
+        return None
+
+    # the buffers as grayscale images of one pixel per byte, so the diff runs in C
+    previous_bytes = Image.frombytes("L", (stride, height), bytes(previous_buffer))
+    current_bytes = Image.frombytes("L", (stride, height), bytes(buffer))
+    diff = ImageChops.difference(previous_bytes, current_bytes)
+    if not diff.getbbox():
+        return []
+
+    # rows with any changed byte
+    _, changed_rows = diff.getprojection()
+    bands = []
+    for row, changed in enumerate(changed_rows):
+        if not changed:
+            continue
+        if bands and row - bands[-1][1] <= min_row_gap:
+            bands[-1][1] = row + 1
+        else:
+            bands.append([row, row + 1])
+
+    if len(bands) > max_boxes:
+        bands = [[bands[0][0], bands[-1][1]]]
+
+    boxes = []
+    for top, bottom in bands:
+        left, _, right, _ = diff.crop((0, top, stride, bottom)).getbbox()
+        boxes.append((left * 8, top, min(right * 8, width), bottom))
+    return boxes
+
+def get_changed_fraction(previous_buffer, buffer):
+    """Returns the share of bytes, from 0 to 1, that differ between two frame buffers of any layout.
+
+    Used for the 2 and 4 bit layouts get_dirty_boxes does not address, where a byte holds a fixed number of
+    pixels so the share of bytes is the share of the panel. Returns None if the buffers cannot be compared.
+    """
+    if previous_buffer is None or not buffer or len(previous_buffer) != len(buffer):
+        return None
+    previous_bytes = Image.frombytes("L", (len(buffer), 1), bytes(previous_buffer))
+    current_bytes = Image.frombytes("L", (len(buffer), 1), bytes(buffer))
+    unchanged = ImageChops.difference(previous_bytes, current_bytes).histogram()[0]
+    return 1 - unchanged / len(buffer)
+
+def crop_buffer(buffer, width, box):
+    """Returns the bytes of a 1-bit frame buffer inside a byte aligned box, row by row."""
+    stride = get_row_stride(width)
+    height = len(buffer) // stride
+    left, top, right, bottom = box
+    frame = Image.frombytes("L", (stride, height), bytes(buffer))
+    return frame.crop((left // 8, top, get_row_stride(right), bottom)).tobytes()
@@ -0,0 +1,102 @@
+import time
+import logging
+from utils.metrics import DISPLAY_CLEARS_TOTAL, DISPLAY_UPDATES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# how a frame is sent to the panel
+PARTIAL = "partial"
+FULL = "full"
+CLEAR = "clear"
+
+DEFAULT_POLICY = {
+    # Clear() before a full update once this many updates were made since the last one, 1 clears every time
+    "clear_interval_updates": 5,
+    # or once this many seconds passed since the last Clear()
+    "clear_interval_seconds": 86400,
+    # or when at least this share of the panel changed, if the change could be measured
+    "clear_change_threshold": 0.5,
+    # a full update after this many partial updates in a row, 0 never forces one
+    "full_refresh_interval": 10,
+    # a full update when more than this share of the panel changed
+    "partial_max_area": 0.5,
+    # keep the panel awake this long after an update, so a quick next update needs no init()
+    "sleep_delay_seconds": 0
+}
+
+class RefreshPolicy:
+    """Decides how each frame is sent to an e-paper panel, within a ghosting budget.
+
+    Every update leaves some ghosting behind. A Clear() cycle removes it but costs a full refresh of its
+    own, so it is only done when the number of updates or the time since the last one runs out, or when
+    most of the panel changes. Partial updates are used for small changes when the driver supports them,
+    with a full update forced after a number of them in a row.
+
+    Attributes:
+        display_type (str): The panel the policy is for, used as the metrics label.
+        settings (dict): The DEFAULT_POLICY keys, with the overrides for the display type applied.
+        updates_since_clear (int): Updates made since the last Clear().
+        partials_since_full (int): Partial updates made since the last full update.
+        last_clear_time (float): Monotonic time of the last Clear(), None before the first one.
+    """
+
+    def __init__(self, display_type, settings=None):
+        self.display_type = display_type
+        self.settings = {**DEFAULT_POLICY, **(settings or {})}
+        self.updates_since_clear = 0
+        self.partials_since_full = 0
+        self.last_clear_time = None
+
+    @classmethod
+    def from_config(cls, device_config, display_type):
+        """Creates the policy for the display type.
+
+        Defaults come from DEFAULT_POLICY and the waveshare_full_refresh_interval and waveshare_partial_max_area
+        settings, and are overridden by display_refresh_policy[display_type] from the device config.
+        """
+        settings = {}
+        for key, config_key in (("full_refresh_interval", "waveshare_full_refresh_interval"), ("partial_max_area", "waveshare_partial_max_area")):
+            value = device_config.get_config(config_key, default=None)
+            if value is not None:
+                settings[key] = value
+        settings.update(device_config.get_config("display_refresh_policy", default={}).get(display_type, {}))
+        return cls(display_type, settings)
+
+    def decide(self, change_area, partial_supported):
+        """Returns PARTIAL, FULL or CLEAR for a frame that changed change_area (0 to 1) of the panel, None if unmeasured."""
+        if partial_supported and change_area is not None and change_area <= self.settings["partial_max_area"]:
+            full_refresh_interval = self.settings["full_refresh_interval"]
+            if not full_refresh_interval or self.partials_since_full < full_refresh_interval:
+                return PARTIAL
+            logger.info(f"Full refresh after {self.partials_since_full} partial updates.")
+
+        reason = self._get_clear_reason(change_area)
+        if reason:
+            logger.info(f"Clearing the display before the update. | reason: {reason}")
+            DISPLAY_CLEARS_TOTAL.inc(display_type=self.display_type, reason=reason)
+            return CLEAR
+        return FULL
+
+    def record_update(self, mode):
+        """Records an update sent to the panel in the given mode."""
+        DISPLAY_UPDATES_TOTAL.inc(display_type=self.display_type, mode=mode)
+        if mode == CLEAR:
+            self.updates_since_clear = 0
+            self.last_clear_time = time.monotonic()
+        self.updates_since_clear += 1
+        self.partials_since_full = self.partials_since_full + 1 if mode == PARTIAL else 0
+
+    def get_sleep_delay(self):
+        """Returns the seconds to keep the panel awake after an update."""
+        return self.settings["sleep_delay_seconds"]
+
+    def _get_clear_reason(self, change_area):
+        if self.last_clear_time is None:
+            return "first_update"
+        if self.updates_since_clear >= self.settings["clear_interval_updates"]:
+            return "update_budget"
+        if time.monotonic() - self.last_clear_time >= self.settings["clear_interval_seconds"]:
+            return "time_budget"
+        if change_area is not None and change_area >= self.settings["clear_change_threshold"]:
+            return "large_change"
+        return None
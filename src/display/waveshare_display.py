@@ -1,13 +1,25 @@
 import inspect
 import importlib
 import logging
+import threading
 
 from display.abstract_display import AbstractDisplay
+from display.frame_diff import get_dirty_boxes, get_changed_fraction, crop_buffer
+from display.refresh_policy import RefreshPolicy, PARTIAL, FULL, CLEAR
+from display.waveshare_epd.framebuffer import get_buffer_packer
+from display.waveshare_epd.spi_transfer import configure_spi
+from display.waveshare_epd.busy_wait import install_busy_waits, DEFAULT_BUSY_TIMEOUT_MS
 from PIL import Image
 from plugins.plugin_registry import get_plugin_instance
+from utils.metrics import DISPLAY_INITS_TOTAL
 
 logger = logging.getLogger(__name__)
 
+# driver methods that switch the controller to the partial update waveform, by module version
+PARTIAL_INIT_METHODS = ("init_part", "init_Partial", "init_partial")
+# driver methods updating the panel with the partial waveform, for a window or for the whole frame
+PARTIAL_DISPLAY_METHODS = ("displayPartial", "display_Partial")
+
 class WaveshareDisplay(AbstractDisplay):
     """
     Handles Waveshare e-paper display dynamically based on device type.
@@ -17,6 +29,16 @@ class WaveshareDisplay(AbstractDisplay):
     multiple Waveshare EPD models.  
 
     The module drivers are in display.waveshare_epd.
+
+    With waveshare_partial_refresh enabled, monochrome panels whose driver has a partial update entry point
+    are updated without the full flashing cycle. Only the regions that changed since the last frame are sent
+    if the driver takes a window.
+
+    Frames are packed into the controller's buffer by display.waveshare_epd.framebuffer for the display types
+    it registers, and by the driver's getbuffer otherwise.
+
+    How each frame is sent, and when the panel is cleared first, is decided by a RefreshPolicy configured per
+    display type in display_refresh_policy. The panel is not initialized again while it is still awake.
     """
 
     def initialize_display(self):
@@ -41,6 +63,11 @@ class WaveshareDisplay(AbstractDisplay):
         if not display_type:
             raise ValueError("Waveshare driver but 'display_type' not specified in configuration.")
 
+        # SPI clock and transfer chunk size for the panel, applied when the driver opens the bus
+        configure_spi(
+            speed_hz=self.device_config.get_config("waveshare_spi_speed_hz"),
+            chunk_size=self.device_config.get_config("waveshare_spi_chunk_size"))
+
         # Construct module path dynamically - e.g. "display.waveshare_epd.epd7in3e"
         module_name = f"display.waveshare_epd.{display_type}" 
 
@@ -48,6 +75,13 @@ class WaveshareDisplay(AbstractDisplay):
             # Dynamically load module
             epd_module = importlib.import_module(module_name)  
             self.epd_display = epd_module.EPD()  
+
+            # wait for the BUSY line with GPIO edge events instead of the driver's polling loops, where registered
+            busy_timeout_ms = self.device_config.get_config("waveshare_busy_timeout_ms", default=DEFAULT_BUSY_TIMEOUT_MS)
+            busy_waits = install_busy_waits(
+                self.epd_display, display_type, importlib.import_module("display.waveshare_epd.epdconfig"), timeout_ms=busy_timeout_ms)
+            if busy_waits:
+                logger.info(f"Waiting for the BUSY line on GPIO edges. | methods: {', '.join(busy_waits)}")
             
             self.epd_display.init()
 
@@ -61,6 +95,19 @@ class WaveshareDisplay(AbstractDisplay):
 
         self.bi_color_display = len(display_args_spec.args) > 2
 
+        # the buffer on the panel, and the waveform the panel was initialized for, None while it sleeps
+        self.display_type = display_type
+        self.last_buffer = None
+        self.panel_mode = FULL
+        self.panel_lock = threading.Lock()
+        self.sleep_timer = None
+        self.refresh_policy = RefreshPolicy.from_config(self.device_config, display_type)
+        self.partial_window_method, self.partial_frame_method = self._find_partial_methods()
+
+        # a vectorized packer if the display type's buffer layout is registered, and the blank colour buffers by image size
+        self.pack_buffer = get_buffer_packer(display_type)
+        self.blank_color_buffers = {}
+
         # update the resolution directly from the loaded device context
         if not self.device_config.get_config("resolution"):
             self.device_config.update_value(
@@ -89,24 +136,127 @@ class WaveshareDisplay(AbstractDisplay):
         if not image:
             raise ValueError(f"No image provided.")
 
-        # Assume device was in sleep mode.
-        self.epd_display.init()
+        width, height = int(self.epd_display.width), int(self.epd_display.height)
+        buffer = self.pack_buffer and self.pack_buffer(image, width, height)
+        if buffer is None:
+            buffer = self.epd_display.getbuffer(image)
+        boxes = get_dirty_boxes(self.last_buffer, buffer, width, height)
+        if boxes is None:
+            # not a 1 bit layout, or nothing to compare against, None if the change cannot be measured
+            change_area = get_changed_fraction(self.last_buffer, buffer)
+        else:
+            change_area = sum((right - left) * (bottom - top) for left, top, right, bottom in boxes) / (width * height)
+        if change_area == 0:
+            logger.info("Frame buffer unchanged, skipping the Waveshare display update.")
+            return
+
+        mode = self.refresh_policy.decide(change_area, boxes is not None and self._is_partial_supported(image))
+
+        with self.panel_lock:
+            self._cancel_sleep()
+            if mode == PARTIAL:
+                self._display_partial(buffer, boxes)
+            else:
+                self._display_full(buffer, image, clear=mode == CLEAR)
+            self.refresh_policy.record_update(mode)
+            self.last_buffer = buffer
+            self._schedule_sleep()
+
+    def _display_full(self, buffer, image, clear):
+        """Displays the buffer with the full refresh waveform, after clearing the panel if clear is set."""
+        self._wake(FULL)
 
         # Clear residual pixels before updating the image.
-        self.epd_display.Clear()
+        if clear:
+            self.epd_display.Clear()
 
-        # Display the image on the WS display.
-        if not self.bi_color_display:
-            self.epd_display.display(self.epd_display.getbuffer(image))
+        # Display the image on the WS display, as the base image for later partial updates if the driver needs one
+        if self.bi_color_display:
+            if image.size not in self.blank_color_buffers:
+                color_image = Image.new('1', image.size, 255)
+                self.blank_color_buffers[image.size] = self.epd_display.getbuffer(color_image)
+            self.epd_display.display(buffer, self.blank_color_buffers[image.size])
+        elif hasattr(self.epd_display, "displayPartBaseImage") and self._is_partial_refresh_enabled():
+            self.epd_display.displayPartBaseImage(buffer)
         else:
-            color_image = Image.new('1', image.size, 255)
-            self.epd_display.display(
-                self.epd_display.getbuffer(image),
-                self.epd_display.getbuffer(color_image)
-            )
+            self.epd_display.display(buffer)
 
+    def _display_partial(self, buffer, boxes):
+        """Displays the changed boxes of the buffer, or the whole buffer, with the partial refresh waveform."""
+        self._wake(PARTIAL)
+
+        if self.partial_window_method:
+            width = int(self.epd_display.width)
+            for box in boxes:
+                logger.info(f"Partially updating Waveshare display. | box: {box}")
+                self.partial_window_method(crop_buffer(buffer, width, box), *box)
+        else:
+            logger.info("Partially updating Waveshare display.")
+            self.partial_frame_method(buffer)
+
+    def _wake(self, panel_mode):
+        """Initializes the panel for the full or partial waveform, unless it is already awake in that mode."""
+        if self.panel_mode == panel_mode:
+            DISPLAY_INITS_TOTAL.inc(display_type=self.display_type, result="skipped")
+            return
+
+        init_method = self.epd_display.init
+        if panel_mode == PARTIAL:
+            init_method = next((getattr(self.epd_display, name) for name in PARTIAL_INIT_METHODS if hasattr(self.epd_display, name)), init_method)
+        init_method()
+        self.panel_mode = panel_mode
+        DISPLAY_INITS_TOTAL.inc(display_type=self.display_type, result="sent")
+
+    def _schedule_sleep(self):
+        """Puts the panel to sleep now, or after the sleep delay of the refresh policy so a quick next update skips init()."""
+        sleep_delay = self.refresh_policy.get_sleep_delay()
+        if not sleep_delay:
+            self._sleep()
+            return
+        self.sleep_timer = threading.Timer(sleep_delay, self._sleep_when_idle)
+        self.sleep_timer.daemon = True
+        self.sleep_timer.start()
+
+    def _cancel_sleep(self):
+        if self.sleep_timer:
+            self.sleep_timer.cancel()
+            self.sleep_timer = None
+
+    def _sleep_when_idle(self):
+        with self.panel_lock:
+            if self.sleep_timer and threading.current_thread() is self.sleep_timer:
+                self.sleep_timer = None
+                self._sleep()
+
+    def _sleep(self):
         # Put device into low power mode (EPD displays maintain image when powered off)
         logger.info("Putting Waveshare display into sleep mode for power saving.")
         self.epd_display.sleep()
+        self.panel_mode = None
+
+    def _is_partial_supported(self, image):
+        """Returns whether the frame can be sent with a partial update, an image the driver rotated into the buffer is not."""
+        if self.bi_color_display or not self._is_partial_refresh_enabled():
+            return False
+        if self.partial_window_method:
+            return image.size == (int(self.epd_display.width), int(self.epd_display.height))
+        return bool(self.partial_frame_method)
 
-        
\ No newline at end of file
+    def _is_partial_refresh_enabled(self):
+        return bool(self.device_config.get_config("waveshare_partial_refresh", default=False))
+
+    def _find_partial_methods(self):
+        """Returns the driver's windowed partial update method and its whole frame one, either may be None.
+
+        A windowed method takes the buffer of the window and its Xstart, Ystart, Xend and Yend.
+        """
+        window_method, frame_method = None, None
+        for name in PARTIAL_DISPLAY_METHODS:
+            method = getattr(self.epd_display, name, None)
+            if not method:
+                continue
+            if len(inspect.getfullargspec(method).args) >= 6:
+                window_method = window_method or method
+            else:
+                frame_method = frame_method or method
+        return window_method, frame_method
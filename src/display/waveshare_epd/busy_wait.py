@@ -0,0 +1,99 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUSY_TIMEOUT_MS = 60000
+DEFAULT_BUSY_POLL_MS = 10
+# longest single wait for an edge before the level is read again, bounds the delay of an edge missed while arming
+EDGE_RECHECK_MS = 100
+
+# driver methods that poll the BUSY line, replaced by epdconfig.wait_busy, with the level each of them waits for
+BUSY_WAIT_METHODS = {
+    "epd5in65f": {"ReadBusyHigh": 1, "ReadBusyLow": 0},
+    "epd7in3f": {"ReadBusyH": 1},
+    "epd7in3e": {"ReadBusyH": 1}
+}
+
+def install_busy_waits(epd_display, display_type, epdconfig, timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+    """Replaces the driver's BUSY polling loops with edge triggered waits, if the display type is registered.
+
+    Returns the names of the replaced methods.
+    """
+    methods = BUSY_WAIT_METHODS.get(display_type, {})
+    for name, level in methods.items():
+        if hasattr(epd_display, name):
+            setattr(epd_display, name, _make_busy_wait(epdconfig, name, level, timeout_ms))
+    return [name for name in methods if hasattr(epd_display, name)]
+
+def poll_for_level(read, level, timeout_ms, poll_ms=DEFAULT_BUSY_POLL_MS):
+    """Reads the BUSY line every poll_ms until it is at the level, returns False if timeout_ms passes first."""
+    deadline = time.monotonic() + timeout_ms / 1000.0
+    while read() != level:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_ms / 1000.0)
+    return True
+
+def wait_for_gpio_edge(gpio, pin, level, timeout_ms, poll_ms=DEFAULT_BUSY_POLL_MS):
+    """Waits for the pin to reach the level with an RPi.GPIO style wait_for_edge, polling if edge detection is unavailable.
+
+    The level is read again at least every EDGE_RECHECK_MS, in case it changed before the edge wait was armed.
+    """
+    edge = gpio.RISING if level else gpio.FALLING
+    deadline = time.monotonic() + timeout_ms / 1000.0
+    while gpio.input(pin) != level:
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            return False
+        try:
+            gpio.wait_for_edge(pin, edge, timeout=min(remaining_ms, EDGE_RECHECK_MS))
+        except (RuntimeError, AttributeError):
+            logger.debug("Edge detection unavailable on the BUSY pin, polling it.")
+            return poll_for_level(lambda: gpio.input(pin), level, remaining_ms, poll_ms)
+    return True
+
+def _make_busy_wait(epdconfig, name, level, timeout_ms):
+    def wait_busy():
+        logger.debug(f"e-Paper busy | method: {name}")
+        if not epdconfig.wait_busy(level, timeout_ms):
+            logger.warning(f"e-Paper BUSY line did not release in time. | method: {name}, timeout_ms: {timeout_ms}")
+        logger.debug("e-Paper busy release")
+    return wait_busy
+
+class SimulatedPin:
+    """A GPIO line whose level is set from code, waking the threads waiting on it at each edge.
+
+    Attributes:
+        value (int): Current level of the line.
+        last_edge_time (float): perf_counter time of the last level change, None before the first one.
+    """
+
+    def __init__(self, value=0):
+        self.value = value
+        self.last_edge_time = None
+        self.condition = threading.Condition()
+        self.pulse_timer = None
+
+    def set(self, value):
+        """Sets the level of the line, an edge if it changes."""
+        with self.condition:
+            if value != self.value:
+                self.value = value
+                self.last_edge_time = time.perf_counter()
+                self.condition.notify_all()
+
+    def pulse(self, value, seconds):
+        """Holds the line at the value for the given seconds, then sets it to the other level; a new pulse extends the last one."""
+        if self.pulse_timer:
+            self.pulse_timer.cancel()
+        self.set(value)
+        self.pulse_timer = threading.Timer(seconds, self.set, (1 - value,))
+        self.pulse_timer.daemon = True
+        self.pulse_timer.start()
+
+    def wait_for_value(self, value, timeout=None):
+        """Blocks until the line is at the value, returns False if the timeout in seconds passes first."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.value == value, timeout)
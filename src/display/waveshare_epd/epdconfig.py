@@ -35,6 +35,9 @@ import subprocess
 
 from ctypes import *
 
+from .spi_transfer import spi_settings, to_bytes, write_bulk
+from .busy_wait import DEFAULT_BUSY_POLL_MS, wait_for_gpio_edge
+
 logger = logging.getLogger(__name__)
 
 
@@ -98,11 +101,18 @@ class RaspberryPi:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, level, timeout_ms, poll_ms=DEFAULT_BUSY_POLL_MS):
+        # gpiozero sets the device's events from the pin's edge callbacks
+        timeout = timeout_ms / 1000.0
+        if level:
+            return self.GPIO_BUSY_PIN.wait_for_active(timeout)
+        return self.GPIO_BUSY_PIN.wait_for_inactive(timeout)
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
-        self.SPI.writebytes2(data)
+        write_bulk(self.SPI.writebytes2, data)
 
     def DEV_SPI_write(self, data):
         self.DEV_SPI.DEV_SPI_SendData(data)
@@ -141,7 +151,7 @@ class RaspberryPi:
         else:
             # SPI device, bus = 0, device = 0
             self.SPI.open(0, 0)
-            self.SPI.max_speed_hz = 4000000
+            self.SPI.max_speed_hz = spi_settings["speed_hz"]
             self.SPI.mode = 0b00
         return 0
 
@@ -201,12 +211,17 @@ class JetsonNano:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, level, timeout_ms, poll_ms=DEFAULT_BUSY_POLL_MS):
+        return wait_for_gpio_edge(self.GPIO, self.BUSY_PIN, level, timeout_ms, poll_ms)
+
     def spi_writebyte(self, data):
         self.SPI.SYSFS_software_spi_transfer(data[0])
 
     def spi_writebyte2(self, data):
-        for i in range(len(data)):
-            self.SPI.SYSFS_software_spi_transfer(data[i])
+        # the software SPI library only transfers a byte per call, so keep the loop free of lookups
+        transfer = self.SPI.SYSFS_software_spi_transfer
+        for value in to_bytes(data):
+            transfer(value)
 
     def module_init(self):
         self.GPIO.setmode(self.GPIO.BCM)
@@ -262,6 +277,9 @@ class SunriseX3:
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
+    def wait_busy(self, level, timeout_ms, poll_ms=DEFAULT_BUSY_POLL_MS):
+        return wait_for_gpio_edge(self.GPIO, self.BUSY_PIN, level, timeout_ms, poll_ms)
+
     def spi_writebyte2(self, data):
         # for i in range(len(data)):
         #     self.SPI.writebytes([data[i]])
@@ -282,7 +300,7 @@ class SunriseX3:
         
             # SPI device, bus = 0, device = 0
             self.SPI.open(2, 0)
-            self.SPI.max_speed_hz = 4000000
+            self.SPI.max_speed_hz = spi_settings["speed_hz"]
             self.SPI.mode = 0b00
             return 0
         else:
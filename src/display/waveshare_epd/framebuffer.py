@@ -0,0 +1,67 @@
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+# palettes of the 7-colour panels, in the order of the controller's colour indexes
+ACEP_7COLOR_PALETTE = (0, 0, 0, 255, 255, 255, 0, 255, 0, 0, 0, 255, 255, 0, 0, 255, 255, 0, 255, 128, 0)
+SPECTRA_6COLOR_PALETTE = (0, 0, 0, 255, 255, 255, 255, 255, 0, 255, 0, 0, 0, 0, 0, 0, 0, 255, 0, 255, 0)
+
+# buffer layout of the display types whose driver getbuffer these functions reproduce byte for byte
+DISPLAY_LAYOUTS = {
+    "epd7in5_V2": ("1bit", {"invert": True}),
+    "epd5in65f": ("4bit_color", {"palette": ACEP_7COLOR_PALETTE}),
+    "epd7in3f": ("4bit_color", {"palette": ACEP_7COLOR_PALETTE}),
+    "epd7in3e": ("4bit_color", {"palette": SPECTRA_6COLOR_PALETTE})
+}
+
+def get_buffer_packer(display_type):
+    """Returns a function packing an image into the frame buffer of the display type, or None if it is not registered.
+
+    The function takes the image and the panel width and height, and returns None for an image of neither
+    the panel size nor the rotated panel size, which the driver's getbuffer handles instead.
+    """
+    if display_type not in DISPLAY_LAYOUTS:
+        return None
+    layout, options = DISPLAY_LAYOUTS[display_type]
+    pack = PACKERS[layout]
+    return lambda image, width, height: pack(image, width, height, **options)
+
+def pack_1bit(image, width, height, invert=False):
+    """Packs an image into a 1 bit buffer, 8 pixels per byte, most significant bit first.
+
+    PIL sets the bit of a white pixel, invert sets the bits of black pixels for controllers where 1 is black.
+    """
+    image = _rotate_to_panel(image, width, height)
+    if image is None:
+        return None
+    buffer = np.frombuffer(image.convert("1").tobytes("raw"), dtype=np.uint8)
+    if invert:
+        buffer = buffer ^ 0xFF
+    return bytearray(buffer.tobytes())
+
+def pack_4bit_color(image, width, height, palette):
+    """Quantizes an image to the panel palette and packs it into a 4 bit buffer, 2 pixels per byte, the left in the top bits."""
+    image = _rotate_to_panel(image, width, height)
+    if image is None:
+        return None
+    indexes = np.frombuffer(image.convert("RGB").quantize(palette=_get_palette_image(palette)).tobytes("raw"), dtype=np.uint8)
+    return bytearray(((indexes[0::2] << 4) | indexes[1::2]).tobytes())
+
+@lru_cache(maxsize=None)
+def _get_palette_image(palette):
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette(palette + (0, 0, 0) * (256 - len(palette) // 3))
+    return palette_image
+
+def _rotate_to_panel(image, width, height):
+    if image.size == (width, height):
+        return image
+    if image.size == (height, width):
+        return image.transpose(Image.Transpose.ROTATE_90)
+    return None
+
+PACKERS = {
+    "1bit": pack_1bit,
+    "4bit_color": pack_4bit_color
+}
@@ -0,0 +1,83 @@
+import sys
+import time
+import types
+import logging
+from .spi_transfer import spi_settings, write_bulk, FakeSpiDev
+from .busy_wait import DEFAULT_BUSY_POLL_MS, SimulatedPin
+
+logger = logging.getLogger(__name__)
+
+EPDCONFIG_MODULE = "display.waveshare_epd.epdconfig"
+
+class Simulated:
+    """Stands in for an epdconfig hardware backend, SPI transfers are recorded by a FakeSpiDev and the GPIO lines are SimulatedPins.
+
+    After every command byte the panel holds BUSY at busy_level for busy_ms, so busy waits can be measured.
+    Only used by scripts and benchmarks, see install_simulated_epdconfig.
+    """
+    # Pin definition
+    RST_PIN  = 17
+    DC_PIN   = 25
+    CS_PIN   = 8
+    BUSY_PIN = 24
+    PWR_PIN  = 18
+
+    def __init__(self, busy_ms=0, busy_level=0):
+        self.SPI = FakeSpiDev()
+        self.busy_ms = busy_ms
+        self.busy_level = busy_level
+        self.GPIO_BUSY_PIN = SimulatedPin(1 - busy_level)
+        self.GPIO_PINS = {pin: SimulatedPin() for pin in (self.RST_PIN, self.DC_PIN, self.CS_PIN, self.PWR_PIN)}
+
+    def digital_write(self, pin, value):
+        if pin in self.GPIO_PINS:
+            self.GPIO_PINS[pin].set(value)
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN:
+            return self.GPIO_BUSY_PIN.value
+        return self.GPIO_PINS[pin].value
+
+    def delay_ms(self, delaytime):
+        time.sleep(delaytime / 1000.0)
+
+    def wait_busy(self, level, timeout_ms, poll_ms=DEFAULT_BUSY_POLL_MS):
+        return self.GPIO_BUSY_PIN.wait_for_value(level, timeout_ms / 1000.0)
+
+    def spi_writebyte(self, data):
+        self.SPI.writebytes(data)
+        if self.busy_ms and not self.GPIO_PINS[self.DC_PIN].value:
+            self.GPIO_BUSY_PIN.pulse(self.busy_level, self.busy_ms / 1000.0)
+
+    def spi_writebyte2(self, data):
+        write_bulk(self.SPI.writebytes2, data)
+
+    def module_init(self, cleanup=False):
+        self.GPIO_PINS[self.PWR_PIN].set(1)
+        self.SPI.open(0, 0)
+        self.SPI.max_speed_hz = spi_settings["speed_hz"]
+        self.SPI.mode = 0b00
+        return 0
+
+    def module_exit(self, cleanup=False):
+        logger.debug("spi end")
+        self.SPI.close()
+        for pin in (self.RST_PIN, self.DC_PIN, self.PWR_PIN):
+            self.GPIO_PINS[pin].set(0)
+        logger.debug("close 5V, Module enters 0 power consumption ...")
+
+def install_simulated_epdconfig(busy_ms=0, busy_level=0):
+    """Registers a Simulated backend as the epdconfig module, before a driver or WaveshareDisplay imports it.
+
+    The module exposes the backend's methods at module level as epdconfig does for the detected hardware.
+    Returns the Simulated backend.
+    """
+    implementation = Simulated(busy_ms=busy_ms, busy_level=busy_level)
+    module = types.ModuleType(EPDCONFIG_MODULE)
+    module.implementation = implementation
+    for name in [x for x in dir(implementation) if not x.startswith('_')]:
+        setattr(module, name, getattr(implementation, name))
+    sys.modules[EPDCONFIG_MODULE] = module
+    # drivers import it with "from . import epdconfig"
+    setattr(sys.modules[EPDCONFIG_MODULE.rpartition(".")[0]], "epdconfig", module)
+    return implementation
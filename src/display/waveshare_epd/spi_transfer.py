@@ -0,0 +1,113 @@
+import time
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# the most bytes the spidev kernel driver takes in one transfer, raised with spidev.bufsiz on the kernel command line
+SPIDEV_BUFSIZ_PATH = "/sys/module/spidev/parameters/bufsiz"
+DEFAULT_SPIDEV_BUFSIZ = 4096
+DEFAULT_SPI_SPEED_HZ = 4000000
+
+# SPI clock and bulk transfer chunk size of the panel, set by configure_spi before the driver's module_init
+spi_settings = {"speed_hz": DEFAULT_SPI_SPEED_HZ, "chunk_size": None}
+
+def configure_spi(speed_hz=None, chunk_size=None):
+    """Sets the SPI clock speed of the panel and the chunk size of bulk transfers, None keeps the default."""
+    spi_settings["speed_hz"] = int(speed_hz or DEFAULT_SPI_SPEED_HZ)
+    spi_settings["chunk_size"] = int(chunk_size) if chunk_size else None
+    logger.info(f"Configured SPI transfers. | speed_hz: {spi_settings['speed_hz']}, chunk_size: {spi_settings['chunk_size'] or 'spidev bufsiz'}")
+
+@lru_cache(maxsize=1)
+def get_spidev_bufsiz():
+    """Returns the spidev buffer size of the running kernel, or the kernel default if it cannot be read."""
+    try:
+        with open(SPIDEV_BUFSIZ_PATH) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return DEFAULT_SPIDEV_BUFSIZ
+
+def to_bytes(data):
+    """Returns the data as bytes, keeping the low 8 bits of each int as spidev's cast to __u8 does.
+
+    Drivers may hand over negative or out of range ints, e.g. from bitwise inversion, which spidev accepts.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    try:
+        return bytes(data)
+    except ValueError:
+        return bytes(value & 0xFF for value in data)
+
+def write_bulk(write, data, bufsiz=None):
+    """Sends a whole frame buffer with the write function in as few calls as the spidev buffer allows.
+
+    Lists of ints from the drivers' getbuffer are converted to bytes once, and every chunk is passed as a
+    memoryview slice, so spidev copies it through the buffer protocol instead of converting it byte by byte.
+    """
+    view = memoryview(to_bytes(data))
+    bufsiz = bufsiz or get_spidev_bufsiz()
+    chunk_size = min(spi_settings["chunk_size"] or bufsiz, bufsiz)
+    for start in range(0, len(view), chunk_size):
+        write(view[start:start + chunk_size])
+
+class FakeSpiDev:
+    """Stands in for spidev.SpiDev, recording every transfer instead of driving a bus.
+
+    Each write is converted to bytes as spidev does, and the time the bus would take at max_speed_hz is
+    accounted for, or slept through with simulate_wire_time, so transfer throughput can be measured without a panel.
+
+    Attributes:
+        max_speed_hz (int): SPI clock speed set by module_init.
+        mode (int): SPI mode set by module_init.
+        bufsiz (int): Largest transfer writebytes and xfer3 accept, as the kernel's spidev buffer.
+        simulate_wire_time (bool): Whether writes sleep for the time the bus would take.
+        transfers (list): (bytes, host seconds, wire seconds) of every write call.
+    """
+
+    def __init__(self, bufsiz=DEFAULT_SPIDEV_BUFSIZ, simulate_wire_time=False):
+        self.max_speed_hz = DEFAULT_SPI_SPEED_HZ
+        self.mode = 0
+        self.bufsiz = bufsiz
+        self.simulate_wire_time = simulate_wire_time
+        self.transfers = []
+        self.is_open = False
+
+    def open(self, bus, device):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def writebytes(self, data):
+        self._transfer(data, limit=self.bufsiz)
+
+    def writebytes2(self, data):
+        self._transfer(data)
+
+    def xfer3(self, data):
+        return [0] * self._transfer(data)
+
+    def reset(self):
+        """Forgets the recorded transfers."""
+        self.transfers = []
+
+    def get_stats(self):
+        """Returns the write calls, bytes, host seconds and wire seconds of the recorded transfers."""
+        return {
+            "calls": len(self.transfers),
+            "bytes": sum(transfer[0] for transfer in self.transfers),
+            "host_seconds": sum(transfer[1] for transfer in self.transfers),
+            "wire_seconds": sum(transfer[2] for transfer in self.transfers)
+        }
+
+    def _transfer(self, data, limit=None):
+        start = time.perf_counter()
+        payload = bytes(to_bytes(data))
+        if limit and len(payload) > limit:
+            raise OverflowError(f"Argument list size exceeds {limit} bytes.")
+        wire_seconds = len(payload) * 8 / self.max_speed_hz
+        if self.simulate_wire_time:
+            time.sleep(wire_seconds)
+        self.transfers.append((len(payload), time.perf_counter() - start, wire_seconds))
+        return len(payload)
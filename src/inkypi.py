@@ -12,10 +12,12 @@ import os
 import random
 import time
 import sys
+import signal
 import json
 import logging
 import threading
 from utils.app_utils import generate_startup_image
+from utils.browser_service import BrowserService, get_browser_service, set_browser_service
 from flask import Flask, request
 from werkzeug.serving import is_running_from_reloader
 from config import Config
@@ -27,6 +29,8 @@ from blueprints.plugin import plugin_bp
 from blueprints.playlist import playlist_bp
 from jinja2 import ChoiceLoader, FileSystemLoader
 from plugins.plugin_registry import load_plugins
+from plugins.plugin_pool import PluginWorkerPool
+from utils.system_stats import SystemStatsSampler
 from waitress import serve
 
 
@@ -43,14 +47,28 @@ app.jinja_loader = ChoiceLoader([FileSystemLoader(directory) for directory in te
 
 device_config = Config()
 display_manager = DisplayManager(device_config)
-refresh_task = RefreshTask(device_config, display_manager)
-
 load_plugins(device_config.get_plugins())
 
+# optionally generate plugin images in worker processes with hard timeouts
+plugin_pool = None
+if device_config.get_config("plugin_process_pool", default=False):
+    plugin_pool = PluginWorkerPool.from_config(device_config)
+
+# samples cpu, memory, temperature and network usage in the background
+stats_sampler = SystemStatsSampler.from_config(device_config)
+
+refresh_task = RefreshTask(device_config, display_manager, plugin_pool=plugin_pool, stats_sampler=stats_sampler)
+
+# long-lived browser shared by HTML based plugins, started lazily on the first render
+if device_config.get_config("browser_service", default=True):
+    browser_service = BrowserService.from_config(device_config)
+    set_browser_service(browser_service)
+
 # Store dependencies
 app.config['DEVICE_CONFIG'] = device_config
 app.config['DISPLAY_MANAGER'] = display_manager
 app.config['REFRESH_TASK'] = refresh_task
+app.config['SYSTEM_STATS'] = stats_sampler
 
 # Set additional parameters
 app.config['MAX_FORM_PARTS'] = 10_000
@@ -63,8 +81,14 @@ app.register_blueprint(playlist_bp)
 
 if __name__ == '__main__':
 
+    # fork the plugin workers before any background threads are running
+    if plugin_pool:
+        plugin_pool.start()
+
     # start the background refresh task
     refresh_task.start()
+    stats_sampler.start()
+    device_config.secret_store.start()
 
     # display default inkypi image on startup
     if device_config.get_config("startup") is True:
@@ -73,9 +97,21 @@ if __name__ == '__main__':
         display_manager.display_image(img)
         device_config.update_value("startup", False, write=True)
 
+    # exit through the finally block below on systemctl stop, so pending config changes are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     try:
         # Run the Flask app
         app.secret_key = str(random.randint(100000,999999))
-        serve(app, host="0.0.0.0", port=80, threads=1)
+        # handlers take the config's model lock, so requests can be served concurrently
+        serve(app, host="0.0.0.0", port=80, threads=device_config.get_config("web_server_threads", default=4))
     finally:
-        refresh_task.stop()
\ No newline at end of file
+        refresh_task.stop()
+        stats_sampler.stop()
+        device_config.secret_store.stop()
+        if plugin_pool:
+            plugin_pool.stop()
+        browser_service = get_browser_service()
+        if browser_service:
+            browser_service.stop()
+        device_config.flush_config()
\ No newline at end of file
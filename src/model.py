@@ -1,22 +1,31 @@
 import os
+import copy
 import json
+import math
 import logging
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+def time_to_minutes(time_str):
+    """Converts an 'HH:MM' string ('24:00' is the end of the day) to minutes since midnight."""
+    hour, minute = time_str.split(":")
+    return int(hour) * 60 + int(minute)
+
 class RefreshInfo:
     """Keeps track of refresh metadata.
 
     Attributes:
         refresh_time (str): ISO-formatted time string of the refresh.
-        image_hash (int): SHA-256 hash of the image.
+        image_hash (str): BLAKE2b hash of the image, see utils.image_hash.
         refresh_type (str): Refresh type ['Manual Update', 'Playlist'].
         plugin_id (str): Plugin id of the refresh.
         playlist (str): Playlist name if refresh_type is 'Playlist'.
         plugin_instance (str): Plugin instance name if refresh_type is 'Playlist'.
     """
 
+    __slots__ = ("_refresh_time", "refresh_dt", "image_hash", "refresh_type", "plugin_id", "playlist", "plugin_instance")
+
     def __init__(self, refresh_type, plugin_id, refresh_time, image_hash, playlist=None, plugin_instance=None):
         """Initialize RefreshInfo instance."""
         self.refresh_time = refresh_time
@@ -26,12 +35,19 @@ class RefreshInfo:
         self.playlist = playlist
         self.plugin_instance = plugin_instance
 
+    @property
+    def refresh_time(self):
+        return self._refresh_time
+
+    @refresh_time.setter
+    def refresh_time(self, refresh_time):
+        # parsed once here instead of on every get_refresh_datetime call
+        self._refresh_time = refresh_time
+        self.refresh_dt = datetime.fromisoformat(refresh_time) if refresh_time else None
+
     def get_refresh_datetime(self):
         """Returns the refresh time as a datetime object or None if not set."""
-        latest_refresh = None
-        if self.refresh_time:
-            latest_refresh = datetime.fromisoformat(self.refresh_time)
-        return latest_refresh
+        return self.refresh_dt
 
     def to_dict(self):
         refresh_dict = {
@@ -60,17 +76,28 @@ class RefreshInfo:
 class PlaylistManager:
     """A class managing multiple time-based playlists.
 
+    The active playlist for each minute of the day is precomputed into a table, which is rebuilt after
+    playlists are added, updated or deleted through the manager. Plugin instances are indexed by
+    (plugin_id, name); playlists report their changes to the manager through their owner reference.
+
     Attributes:
         playlists (list): A list of Playlist instances managed by the manager.
         active_playlist (str): Name of the currently active playlist.
+        instance_index (dict): Maps (plugin_id, name) to the playlists containing that instance, in order.
     """
     DEFAULT_PLAYLIST_START = "00:00"
     DEFAULT_PLAYLIST_END = "24:00"
+    MINUTES_PER_DAY = 1440
 
     def __init__(self, playlists=[], active_playlist=None):
         """Initialize PlaylistManager with a list of playlists."""
         self.playlists = playlists
         self.active_playlist = active_playlist
+        self.minute_table = None
+        self.transitions = None
+        self.instance_index = {}
+        for playlist in self.playlists:
+            self._adopt(playlist)
 
     def get_playlist_names(self):
         """Returns a list of all playlist names."""
@@ -78,31 +105,65 @@ class PlaylistManager:
 
     def add_default_playlist(self):
         """Add a default playlist to the manager, called when no playlists exist."""
-        return self.playlists.append(
-            Playlist("Default", PlaylistManager.DEFAULT_PLAYLIST_START, PlaylistManager.DEFAULT_PLAYLIST_END, []))
+        self.invalidate_schedule()
+        playlist = Playlist("Default", PlaylistManager.DEFAULT_PLAYLIST_START, PlaylistManager.DEFAULT_PLAYLIST_END, [])
+        self.playlists.append(playlist)
+        return self._adopt(playlist)
 
     def find_plugin(self, plugin_id, instance):
         """Searches playlists to find a plugin with the given ID and instance."""
-        for playlist in self.playlists:
-            plugin = playlist.find_plugin(plugin_id, instance)
-            if plugin:
-                return plugin
-        return None
-
-    def determine_active_playlist(self, current_datetime):
-        """Determine the active playlist based on the current time."""
-        current_time = current_datetime.strftime("%H:%M")  # Get current time in "HH:MM" format
-
-        # get active playlists that have plugins
-        active_playlists = [p for p in self.playlists if p.is_active(current_time)]
-        if not active_playlists:
+        playlists = self.instance_index.get((plugin_id, instance))
+        if not playlists:
             return None
+        return playlists[0].find_plugin(plugin_id, instance)
 
-        # Sort playlists by priority
-        active_playlists.sort(key=lambda p: p.get_priority())
-        playlist = active_playlists[0]
+    def get_plugin_instances(self, plugin_id):
+        """Returns the instances of a plugin across all playlists."""
+        return [instance for playlist in self.playlists for instance in playlist.get_plugins_by_id(plugin_id)]
 
-        return playlist
+    def determine_active_playlist(self, current_datetime):
+        """Determine the active playlist based on the current time."""
+        return self.get_minute_table()[current_datetime.hour * 60 + current_datetime.minute]
+
+    def get_upcoming_transitions(self, current_datetime):
+        """Returns the changes of the active playlist during the next 24 hours, soonest first.
+
+        Each transition is a (minutes from now, playlist) tuple, playlist is None when no playlist is active.
+        """
+        self.get_minute_table()
+        current_minute = current_datetime.hour * 60 + current_datetime.minute
+        upcoming = []
+        for minute, playlist in self.transitions:
+            minutes_ahead = (minute - current_minute) % PlaylistManager.MINUTES_PER_DAY
+            upcoming.append((minutes_ahead or PlaylistManager.MINUTES_PER_DAY, playlist))
+        return sorted(upcoming, key=lambda transition: transition[0])
+
+    def get_minute_table(self):
+        """Returns the list of the active playlist for each minute of the day, building it if needed.
+
+        Playlists active at a minute compete on priority (the shortest time range wins), ties are won by the
+        playlist listed first.
+        """
+        if self.minute_table is None:
+            table = [None] * PlaylistManager.MINUTES_PER_DAY
+            # paint the lowest priority first so higher priorities overwrite it, the priority is the range length
+            ranked = []
+            for index, playlist in enumerate(self.playlists):
+                start, end = playlist.get_minute_range()
+                ranked.append((end - start, index, start, end, playlist))
+            for _, _, start, end, playlist in sorted(ranked, key=lambda item: item[:2], reverse=True):
+                if start < end:
+                    table[start:end] = [playlist] * (end - start)
+
+            transitions = [(minute, table[minute]) for minute in range(PlaylistManager.MINUTES_PER_DAY)
+                           if table[minute] is not table[minute - 1]]
+            self.minute_table, self.transitions = table, transitions
+        return self.minute_table
+
+    def invalidate_schedule(self):
+        """Discards the minute table, call after changing playlist times outside the manager."""
+        self.minute_table = None
+        self.transitions = None
 
     def get_playlist(self, playlist_name):
         """Returns the playlist with the specified name."""
@@ -125,7 +186,10 @@ class PlaylistManager:
             start_time = PlaylistManager.DEFAULT_PLAYLIST_START
         if not end_time:
             end_time = PlaylistManager.DEFAULT_PLAYLIST_END
-        self.playlists.append(Playlist(name, start_time, end_time))
+        playlist = Playlist(name, start_time, end_time)
+        self.playlists.append(playlist)
+        self._adopt(playlist)
+        self.invalidate_schedule()
         return True
 
     def update_playlist(self, old_name, new_name, start_time, end_time):
@@ -135,17 +199,47 @@ class PlaylistManager:
             playlist.name = new_name
             playlist.start_time = start_time
             playlist.end_time = end_time
+            self.invalidate_schedule()
             return True
         logger.warning(f"Playlist '{old_name}' not found.")
         return False
 
     def delete_playlist(self, name):
         """Deletes the playlist with the specified name."""
+        for playlist in self.playlists:
+            if playlist.name == name:
+                for plugin_instance in playlist.plugins:
+                    self._unindex_instance(playlist, plugin_instance.plugin_id, plugin_instance.name)
+                playlist.owner = None
         self.playlists = [p for p in self.playlists if p.name != name]
-
-    def to_dict(self):
+        self.invalidate_schedule()
+
+    def _adopt(self, playlist):
+        """Makes this manager the owner of the playlist and indexes its plugin instances."""
+        playlist.owner = self
+        for plugin_instance in playlist.plugins:
+            self._index_instance(playlist, plugin_instance.plugin_id, plugin_instance.name)
+
+    def _index_instance(self, playlist, plugin_id, name):
+        """Records that the playlist contains the instance, called by Playlist after adding or renaming one."""
+        playlists = self.instance_index.setdefault((plugin_id, name), [])
+        if playlist not in playlists:
+            playlists.append(playlist)
+            if len(playlists) > 1:
+                # find_plugin returns the instance from the first playlist, as a scan would
+                playlists.sort(key=self.playlists.index)
+
+    def _unindex_instance(self, playlist, plugin_id, name):
+        """Records that the playlist no longer contains the instance, called by Playlist after removing or renaming one."""
+        playlists = self.instance_index.get((plugin_id, name), [])
+        if playlist in playlists:
+            playlists.remove(playlist)
+        if not playlists:
+            self.instance_index.pop((plugin_id, name), None)
+
+    def to_dict(self, include_state=True):
         return {
-            "playlists": [p.to_dict() for p in self.playlists],
+            "playlists": [p.to_dict(include_state) for p in self.playlists],
             "active_playlist": self.active_playlist
         }
 
@@ -173,14 +267,25 @@ class Playlist:
         end_time (str): Playlist end time in 'HH:MM'.
         plugins (list): A list of PluginInstance objects within the playlist.
         current_plugin_index (int): Index of the currently active plugin in the playlist.
+        instance_index (dict): Maps (plugin_id, name) to the plugin instance.
+        plugin_id_index (dict): Maps plugin_id to the plugin's instances, in playlist order.
+        owner (PlaylistManager): Manager notified of added, removed and renamed instances, if any.
     """
 
+    __slots__ = ("name", "start_time", "end_time", "plugins", "current_plugin_index", "owner", "instance_index", "plugin_id_index")
+
     def __init__(self, name, start_time, end_time, plugins=None, current_plugin_index=None):
         self.name = name
         self.start_time = start_time
         self.end_time = end_time
         self.plugins = [PluginInstance.from_dict(p) for p in (plugins or [])]
         self.current_plugin_index = current_plugin_index
+        self.owner = None
+        self.instance_index = {}
+        self.plugin_id_index = {}
+        for plugin_instance in self.plugins:
+            self.instance_index.setdefault((plugin_instance.plugin_id, plugin_instance.name), plugin_instance)
+            self.plugin_id_index.setdefault(plugin_instance.plugin_id, []).append(plugin_instance)
 
     def is_active(self, current_time):
         """Check if the playlist is active at the given time."""
@@ -191,31 +296,68 @@ class Playlist:
         if self.find_plugin(plugin_data["plugin_id"], plugin_data["name"]):
             logger.warning(f"Plugin '{plugin_data['plugin_id']}' with instance '{plugin_data['name']}' already exists.")
             return False
-        self.plugins.append(PluginInstance.from_dict(plugin_data))
+        plugin_instance = PluginInstance.from_dict(plugin_data)
+        self.plugins.append(plugin_instance)
+        self._index(plugin_instance)
         return True
 
     def update_plugin(self, plugin_id, instance_name, updated_data):
-        """Updates an existing plugin instance in the playlist."""
+        """Updates an existing plugin instance in the playlist, re-indexing it if it is renamed."""
         plugin = self.find_plugin(plugin_id, instance_name)
-        if plugin:
-            plugin.update(updated_data)
-            return True
-        logger.warning(f"Plugin '{plugin_id}' with name '{instance_name}' not found.")
-        return False
+        if not plugin:
+            logger.warning(f"Plugin '{plugin_id}' with name '{instance_name}' not found.")
+            return False
+
+        new_key = (updated_data.get("plugin_id", plugin_id), updated_data.get("name", instance_name))
+        if new_key != (plugin_id, instance_name) and new_key in self.instance_index:
+            logger.warning(f"Plugin '{new_key[0]}' with instance '{new_key[1]}' already exists.")
+            return False
+
+        self._unindex(plugin)
+        plugin.update(updated_data)
+        self._index(plugin)
+        return True
 
     def delete_plugin(self, plugin_id, name):
         """Remove a specific plugin instance from the playlist."""
-        initial_count = len(self.plugins)
-        self.plugins = [p for p in self.plugins if not (p.plugin_id == plugin_id and p.name == name)]
-        
-        if len(self.plugins) == initial_count:
+        plugin = self.find_plugin(plugin_id, name)
+        if not plugin:
             logger.warning(f"Plugin '{plugin_id}' with instance '{name}' not found.")
             return False
+
+        self.plugins = [p for p in self.plugins if not (p.plugin_id == plugin_id and p.name == name)]
+        self._unindex(plugin)
         return True
 
     def find_plugin(self, plugin_id, name):
         """Find a plugin instance by its plugin_id and name."""
-        return next((p for p in self.plugins if p.plugin_id == plugin_id and p.name == name), None)
+        return self.instance_index.get((plugin_id, name))
+
+    def get_plugins_by_id(self, plugin_id):
+        """Returns the instances of a plugin in this playlist."""
+        return list(self.plugin_id_index.get(plugin_id, []))
+
+    def _index(self, plugin_instance):
+        key = (plugin_instance.plugin_id, plugin_instance.name)
+        self.instance_index[key] = plugin_instance
+        if self.plugins and self.plugins[-1] is plugin_instance:
+            self.plugin_id_index.setdefault(plugin_instance.plugin_id, []).append(plugin_instance)
+        else:
+            # re-indexed in place after an update, keep the per plugin list in playlist order
+            self.plugin_id_index[plugin_instance.plugin_id] = [p for p in self.plugins if p.plugin_id == plugin_instance.plugin_id]
+        if self.owner:
+            self.owner._index_instance(self, *key)
+
+    def _unindex(self, plugin_instance):
+        key = (plugin_instance.plugin_id, plugin_instance.name)
+        self.instance_index.pop(key, None)
+        instances = [p for p in self.plugin_id_index.get(plugin_instance.plugin_id, []) if p is not plugin_instance]
+        if instances:
+            self.plugin_id_index[plugin_instance.plugin_id] = instances
+        else:
+            self.plugin_id_index.pop(plugin_instance.plugin_id, None)
+        if self.owner:
+            self.owner._unindex_instance(self, *key)
 
     def get_next_plugin(self):
         """Returns the next plugin instance in the playlist and update the current_plugin_index."""
@@ -226,10 +368,20 @@ class Playlist:
         
         return self.plugins[self.current_plugin_index]
 
+    def peek_next_plugin(self):
+        """Returns the plugin instance get_next_plugin would return, without updating the current_plugin_index."""
+        if self.current_plugin_index is None:
+            return self.plugins[0]
+        return self.plugins[(self.current_plugin_index + 1) % len(self.plugins)]
+
     def get_priority(self):
         """Determine priority of a playlist, based on the time range"""
         return self.get_time_range_minutes()
 
+    def get_minute_range(self):
+        """Returns the (start, end) minutes of the day the playlist is active, end is exclusive."""
+        return (time_to_minutes(self.start_time), time_to_minutes(self.end_time))
+
     def get_time_range_minutes(self):
         """Calculate the time difference in minutes between start_time and end_time."""
         start = datetime.strptime(self.start_time, "%H:%M")
@@ -242,14 +394,16 @@ class Playlist:
 
         return int((end - start).total_seconds() // 60)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_state=True):
+        playlist_dict = {
             "name": self.name,
             "start_time": self.start_time,
             "end_time": self.end_time,
-            "plugins": [p.to_dict() for p in self.plugins],
-            "current_plugin_index": self.current_plugin_index
+            "plugins": [p.to_dict(include_state) for p in self.plugins]
         }
+        if include_state:
+            playlist_dict["current_plugin_index"] = self.current_plugin_index
+        return playlist_dict
 
     @classmethod
     def from_dict(cls, data):
@@ -270,54 +424,94 @@ class PluginInstance:
         settings (dict): Settings associated with the plugin.
         refresh (dict): Refresh settings, such as interval and scheduled time.
         latest_refresh (str): ISO-formatted string representing the last refresh time.
+        circuit_breaker (CircuitBreaker): Tracks failed renders to back off from a failing upstream API.
+        render_duration (DurationStats): Durations of the plugin's generate_image for this instance.
+        display_duration (DurationStats): Durations of the display updates showing this instance.
+        next_due (datetime): When the instance next needs a new image, None if it never does.
+
+    The latest refresh time and the refresh settings are parsed when they are set, and next_due is
+    recomputed from them, so should_refresh is a single comparison.
     """
 
-    def __init__(self, plugin_id, name, settings, refresh, latest_refresh_time=None):
+    __slots__ = ("plugin_id", "name", "settings", "_refresh", "_latest_refresh_time", "latest_refresh_dt", "scheduled_time",
+                 "next_due", "circuit_breaker", "render_duration", "display_duration")
+
+    # attributes update() may change
+    UPDATABLE_ATTRIBUTES = ("plugin_id", "name", "settings", "refresh", "latest_refresh_time")
+
+    def __init__(self, plugin_id, name, settings, refresh, latest_refresh_time=None, circuit_breaker=None,
+                 render_duration=None, display_duration=None):
         self.plugin_id = plugin_id
         self.name = name
         self.settings = settings
+        self._latest_refresh_time = None
+        self.latest_refresh_dt = None
         self.refresh = refresh
         self.latest_refresh_time = latest_refresh_time
+        self.circuit_breaker = CircuitBreaker.from_dict(circuit_breaker or {})
+        self.render_duration = DurationStats.from_dict(render_duration or {})
+        self.display_duration = DurationStats.from_dict(display_duration or {})
+
+    @property
+    def refresh(self):
+        return self._refresh
+
+    @refresh.setter
+    def refresh(self, refresh):
+        self._refresh = refresh
+        scheduled_time_str = refresh.get("scheduled")
+        self.scheduled_time = datetime.strptime(scheduled_time_str, "%H:%M").time() if scheduled_time_str else None
+        self._update_next_due()
+
+    @property
+    def latest_refresh_time(self):
+        return self._latest_refresh_time
+
+    @latest_refresh_time.setter
+    def latest_refresh_time(self, latest_refresh_time):
+        self._latest_refresh_time = latest_refresh_time
+        self.latest_refresh_dt = datetime.fromisoformat(latest_refresh_time) if latest_refresh_time else None
+        self._update_next_due()
 
     def update(self, updated_data):
         """Update attributes of the class with the dictionary values."""
         for key, value in updated_data.items():
+            if key not in PluginInstance.UPDATABLE_ATTRIBUTES:
+                logger.warning(f"Ignoring unknown plugin instance attribute '{key}'.")
+                continue
             setattr(self, key, value)
 
     def should_refresh(self, current_time):
         """Checks whether the plugin should be refreshed based on its refresh settings and the current time."""
-        latest_refresh_dt = self.get_latest_refresh_dt()
-        if not latest_refresh_dt:
+        if not self.latest_refresh_dt:
             return True
+        return self.next_due is not None and current_time >= self.next_due
 
-        # Check for interval-based refresh
-        if "interval" in self.refresh:
-            interval = self.refresh.get("interval")
-            if interval and (current_time - latest_refresh_dt) >= timedelta(seconds=interval):
-                return True
+    def _update_next_due(self):
+        """Computes when the instance is next due from the latest refresh time and refresh settings.
 
-        # Check for scheduled refresh (HH:MM format)
-        if "scheduled" in self.refresh:
-            scheduled_time_str = self.refresh.get("scheduled")
-            latest_refresh_str = latest_refresh_dt.strftime("%H:%M")
+        - Interval refreshes are due one interval after the latest refresh.
+        - Scheduled refreshes are due immediately if the latest refresh was before the scheduled time of day,
+          otherwise at the scheduled time on the following day.
+        """
+        latest_refresh_dt = self.latest_refresh_dt
+        if not latest_refresh_dt:
+            self.next_due = None
+            return
 
-            # If the latest refresh is before the scheduled time today
-            if latest_refresh_str < scheduled_time_str:
-                return True
-        
-        if "scheduled" in self.refresh:
-            scheduled_time_str = self.refresh.get("scheduled")
-            scheduled_time = datetime.strptime(scheduled_time_str, "%H:%M").time()
-            
-            latest_refresh_date = latest_refresh_dt.date()
-            current_date = current_time.date()
-
-            # Determine if a refresh is needed based on scheduled time and last refresh
-            if (latest_refresh_date < current_date and current_time.time() >= scheduled_time) or \
-            (latest_refresh_date == current_date and latest_refresh_dt.time() < scheduled_time <= current_time.time()):
-                return True
+        due_times = []
+        interval = self._refresh.get("interval")
+        if interval:
+            due_times.append(latest_refresh_dt + timedelta(seconds=interval))
 
-        return False
+        if self.scheduled_time:
+            if latest_refresh_dt.time().replace(second=0, microsecond=0) < self.scheduled_time:
+                due_times.append(latest_refresh_dt)
+            else:
+                next_day = latest_refresh_dt.date() + timedelta(days=1)
+                due_times.append(datetime.combine(next_day, self.scheduled_time, tzinfo=latest_refresh_dt.tzinfo))
+
+        self.next_due = min(due_times) if due_times else None
 
     def get_image_path(self):
         """Formats the image path for this plugin instance."""
@@ -325,19 +519,39 @@ class PluginInstance:
 
     def get_latest_refresh_dt(self):
         """Returns the latest refresh time as a datetime object, or None if not set."""
-        latest_refresh = None
-        if self.latest_refresh_time:
-            latest_refresh = datetime.fromisoformat(self.latest_refresh_time)
-        return latest_refresh
+        return self.latest_refresh_dt
     
-    def to_dict(self):
+    def get_state(self):
+        """Returns the runtime state that changes as the instance is refreshed, by field."""
         return {
+            "latest_refresh_time": self.latest_refresh_time,
+            "circuit_breaker": self.circuit_breaker.to_dict(),
+            "render_duration": self.render_duration.to_dict(),
+            "display_duration": self.display_duration.to_dict(),
+        }
+
+    def set_state(self, field, value):
+        """Restores a runtime state field returned by get_state."""
+        if field == "latest_refresh_time":
+            self.latest_refresh_time = value
+        elif field == "circuit_breaker":
+            self.circuit_breaker = CircuitBreaker.from_dict(value or {})
+        elif field in ("render_duration", "display_duration"):
+            setattr(self, field, DurationStats.from_dict(value or {}))
+        else:
+            logger.warning(f"Ignoring unknown plugin instance state field '{field}'.")
+
+    def to_dict(self, include_state=True):
+        # copies, so a published config version does not change when the instance is edited or rendered
+        plugin_dict = {
             "plugin_id": self.plugin_id,
             "name": self.name,
-            "plugin_settings": self.settings,
-            "refresh": self.refresh,
-            "latest_refresh_time": self.latest_refresh_time,
+            "plugin_settings": copy.deepcopy(self.settings),
+            "refresh": copy.deepcopy(self.refresh),
         }
+        if include_state:
+            plugin_dict.update(self.get_state())
+        return plugin_dict
 
     @classmethod
     def from_dict(cls, data):
@@ -347,4 +561,125 @@ class PluginInstance:
             settings=data["plugin_settings"],
             refresh=data["refresh"],
             latest_refresh_time=data.get("latest_refresh_time"),
-        )
\ No newline at end of file
+            circuit_breaker=data.get("circuit_breaker"),
+            render_duration=data.get("render_duration"),
+            display_duration=data.get("display_duration"),
+        )
+
+class CircuitBreaker:
+    """Circuit breaker for the renders of a plugin instance.
+
+    After failure_threshold consecutive failures the circuit opens and renders are skipped until
+    retry_time. The first render after that is a trial (half-open): success closes the circuit, failure
+    opens it again with the backoff doubled, up to the maximum.
+
+    Attributes:
+        state (str): One of 'closed', 'open' or 'half_open'.
+        failures (int): Number of consecutive failed renders.
+        retry_time (str): ISO-formatted time after which an open circuit allows a trial render.
+        last_error (str): Error message of the latest failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, state=CLOSED, failures=0, retry_time=None, last_error=None):
+        self.state = state
+        self.failures = failures
+        self.retry_time = retry_time
+        self.last_error = last_error
+
+    def is_open(self, current_time):
+        """Returns True if renders should be skipped at current_time."""
+        return self.state == CircuitBreaker.OPEN and current_time < self.get_retry_dt()
+
+    def before_render(self):
+        """Marks an open circuit whose backoff expired as half-open for a trial render."""
+        if self.state == CircuitBreaker.OPEN:
+            self.state = CircuitBreaker.HALF_OPEN
+
+    def record_success(self):
+        """Closes the circuit after a successful render."""
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.retry_time = None
+        self.last_error = None
+
+    def record_failure(self, current_time, error, failure_threshold=3, base_backoff=60, max_backoff=3600):
+        """Records a failed render, opening the circuit with exponential backoff once the threshold is reached."""
+        self.failures += 1
+        self.last_error = str(error)
+        if self.state == CircuitBreaker.HALF_OPEN or self.failures >= failure_threshold:
+            backoff = min(base_backoff * 2 ** max(self.failures - failure_threshold, 0), max_backoff)
+            self.state = CircuitBreaker.OPEN
+            self.retry_time = (current_time + timedelta(seconds=backoff)).isoformat()
+            logger.warning(f"Circuit opened after {self.failures} failures, retrying in {backoff} seconds.")
+
+    def get_retry_dt(self):
+        """Returns the retry time as a datetime object, or None if not set."""
+        return datetime.fromisoformat(self.retry_time) if self.retry_time else None
+
+    def to_dict(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_time": self.retry_time,
+            "last_error": self.last_error,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            state=data.get("state", CircuitBreaker.CLOSED),
+            failures=data.get("failures", 0),
+            retry_time=data.get("retry_time"),
+            last_error=data.get("last_error"),
+        )
+
+class DurationStats:
+    """Exponentially weighted moving average and 95th percentile of a duration.
+
+    Attributes:
+        ewma (float): Moving average in seconds, None until the first sample.
+        samples (list): The most recent durations in seconds, used for the percentile.
+    """
+
+    MAX_SAMPLES = 50
+    ALPHA = 0.3
+
+    def __init__(self, ewma=None, samples=None):
+        self.ewma = ewma
+        self.samples = list(samples or [])
+
+    def record(self, seconds):
+        """Adds a duration sample."""
+        self.ewma = seconds if self.ewma is None else self.ALPHA * seconds + (1 - self.ALPHA) * self.ewma
+        self.samples = (self.samples + [round(seconds, 3)])[-self.MAX_SAMPLES:]
+
+    def get_p95(self):
+        """Returns the 95th percentile of the recent samples, or None if there are none."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(math.ceil(len(ordered) * 0.95) - 1, 0)]
+
+    def get_estimate(self):
+        """Returns a conservative duration estimate, the larger of the average and the 95th percentile."""
+        if self.ewma is None:
+            return None
+        return max(self.ewma, self.get_p95() or 0)
+
+    def to_dict(self):
+        return {
+            "ewma": round(self.ewma, 3) if self.ewma is not None else None,
+            "p95": self.get_p95(),
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            ewma=data.get("ewma"),
+            samples=data.get("samples"),
+        )
@@ -107,6 +107,10 @@ STYLE_OPTIONS = [
 
 DEFAULT_IMAGE_MODEL = "@cf/black-forest-labs/flux-1-schnell"
 CLOUDFLARE_API_BASE = "https://gateway.ai.cloudflare.com/v1/d7d9eea07df9b1cd0c93141bd99239b6/inky-pi/workers-ai"
+
+# seconds to wait for image generation before giving up
+REQUEST_TIMEOUT_SECONDS = 120
+
 class AIImage(BasePlugin):
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
@@ -187,7 +191,7 @@ class AIImage(BasePlugin):
         else:
             logger.info("Using default dimensions (model doesn't support custom size)")
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = requests.post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
         
         if response.status_code != 200:
             error_msg = f"Cloudflare AI API error: {response.status_code}"
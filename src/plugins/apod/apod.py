@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# seconds to wait for the NASA API before giving up
+REQUEST_TIMEOUT_SECONDS = 20
+
 class Apod(BasePlugin):
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
@@ -44,7 +47,7 @@ class Apod(BasePlugin):
         elif settings.get("customDate"):
             params["date"] = settings["customDate"]
 
-        response = requests.get("https://api.nasa.gov/planetary/apod", params=params)
+        response = requests.get("https://api.nasa.gov/planetary/apod", params=params, timeout=REQUEST_TIMEOUT_SECONDS)
 
         if response.status_code != 200:
             logger.error(f"NASA API error: {response.text}")
@@ -58,7 +61,7 @@ class Apod(BasePlugin):
         image_url = data.get("hdurl") or data.get("url")
 
         try:
-            img_data = requests.get(image_url)
+            img_data = requests.get(image_url, timeout=REQUEST_TIMEOUT_SECONDS)
             image = Image.open(BytesIO(img_data.content))
         except Exception as e:
             logger.error(f"Failed to load APOD image: {str(e)}")
@@ -0,0 +1,330 @@
+import os
+import queue
+import signal
+import logging
+import traceback
+import threading
+import multiprocessing
+from multiprocessing import reduction, resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from PIL import Image
+from plugins.plugin_registry import get_plugin_instance
+from utils.browser_service import BrowserService, get_browser_service, set_browser_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_TASKS = 25
+DEFAULT_RENDER_TIMEOUT_SECONDS = 120
+
+class PluginTimeoutError(RuntimeError):
+    """Raised when a plugin does not finish generating its image within its render timeout."""
+
+class PluginWorker:
+    """A worker process that generates plugin images.
+
+    Attributes:
+        pid (int): Process id of the worker, a child of the launcher rather than of the app.
+        conn (multiprocessing.connection.Connection): Parent end of the pipe to the worker.
+        tasks (int): Number of images generated by this worker.
+    """
+
+    def __init__(self, launcher):
+        self.pid, self.conn = launcher.launch()
+        self.tasks = 0
+
+    def is_alive(self):
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def stop(self, timeout=5):
+        """Asks the worker to exit and kills it if it does not."""
+        try:
+            self.conn.send(("stop",))
+            # the pipe reads as closed once the worker exits
+            self.conn.poll(timeout)
+        except (OSError, ValueError):
+            pass
+        self.kill()
+
+    def kill(self):
+        """Terminates the worker immediately, e.g. after a render timeout."""
+        if self.is_alive():
+            os.kill(self.pid, signal.SIGKILL)
+        self.conn.close()
+
+class WorkerLauncher:
+    """A process that forks the plugin workers.
+
+    It is forked when the pool starts, while the app is still single threaded. Workers forked from it,
+    including the replacements made later, inherit the loaded plugin registry but never a lock that one of
+    the app's threads held at the time of the fork.
+
+    Attributes:
+        process (multiprocessing.Process): The launcher process.
+        conn (multiprocessing.connection.Connection): Parent end of the pipe to the launcher.
+    """
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_launcher_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def launch(self):
+        """Forks a new worker and returns its pid and the parent end of the pipe to it."""
+        try:
+            self.conn.send(("launch",))
+            fd = reduction.recv_handle(self.conn)
+            pid = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError("Plugin worker launcher is not running.") from e
+        return pid, Connection(fd)
+
+    def stop(self, timeout=5):
+        """Asks the launcher to exit and kills it if it does not."""
+        try:
+            self.conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class PluginWorkerPool:
+    """Runs plugin generate_image calls in separate processes.
+
+    A plugin that hangs or leaks memory cannot block or bloat the web server and refresh thread: each call
+    runs in a worker process with a hard timeout, after which the worker is killed and replaced. Workers are
+    also replaced after max_tasks images to bound memory growth. The plugin settings and a snapshot of the
+    device config are sent to the worker, the image comes back through shared memory.
+
+    Workers are forked from a WorkerLauncher, so they inherit the loaded plugin registry without re-running the
+    app module, and are never forked from the app once its threads are running.
+
+    Attributes:
+        pool_size (int): Number of worker processes.
+        max_tasks (int): Images a worker generates before it is replaced.
+        render_timeout (float): Default seconds a plugin may take, plugins can override it with
+            'render_timeout_seconds' in plugin-info.json.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, max_tasks=DEFAULT_MAX_TASKS, render_timeout=DEFAULT_RENDER_TIMEOUT_SECONDS):
+        self.pool_size = max(int(pool_size), 1)
+        self.max_tasks = max(int(max_tasks), 1)
+        self.render_timeout = render_timeout
+        self.context = multiprocessing.get_context("fork")
+        self.launcher = None
+        self.idle_workers = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.running = False
+
+    @classmethod
+    def from_config(cls, device_config):
+        """Creates a pool using the plugin_pool_* settings from the device config."""
+        return cls(
+            pool_size=device_config.get_config("plugin_pool_size", default=DEFAULT_POOL_SIZE),
+            max_tasks=device_config.get_config("plugin_pool_max_tasks", default=DEFAULT_MAX_TASKS),
+            render_timeout=device_config.get_config("plugin_render_timeout_seconds", default=DEFAULT_RENDER_TIMEOUT_SECONDS)
+        )
+
+    def start(self):
+        """Starts the launcher and the worker processes. Call before starting other threads so the launcher fork is clean."""
+        with self.lock:
+            if self.running:
+                return
+            # workers share the parent's tracker, so segments the parent unlinks are not reported as leaked
+            resource_tracker.ensure_running()
+            logger.info(f"Starting plugin worker pool. | pool_size: {self.pool_size}")
+            self.launcher = WorkerLauncher(self.context)
+            self.running = True
+            for _ in range(self.pool_size):
+                self.idle_workers.put(self._spawn_worker())
+
+    def stop(self):
+        """Stops all worker processes."""
+        with self.lock:
+            self.running = False
+            workers, self.workers = self.workers, []
+        logger.info("Stopping plugin worker pool")
+        for worker in workers:
+            worker.stop()
+        if self.launcher:
+            self.launcher.stop()
+
+    def wrap(self, plugin):
+        """Returns a plugin whose generate_image runs in the pool."""
+        return PooledPlugin(plugin, self)
+
+    def generate_image(self, plugin_config, settings, device_config):
+        """Generates an image with the plugin in a worker process and returns it.
+
+        Changes the plugin makes to settings, e.g. advancing an image index, are copied back into settings.
+        Raises PluginTimeoutError if the render timeout is exceeded and RuntimeError if the plugin fails.
+        """
+        if not self.running:
+            raise RuntimeError("Plugin worker pool is not running.")
+
+        plugin_id = plugin_config.get("id")
+        timeout = plugin_config.get("render_timeout_seconds", self.render_timeout)
+        worker = self.idle_workers.get()
+        try:
+            if not worker.is_alive():
+                worker = self._replace_worker(worker)
+            worker.conn.send(("render", plugin_id, settings, device_config.snapshot()))
+            if not worker.conn.poll(timeout):
+                logger.error(f"Plugin render timed out, killing worker. | plugin_id: {plugin_id} | timeout: {timeout}")
+                worker = self._replace_worker(worker)
+                raise PluginTimeoutError(f"Plugin '{plugin_id}' did not finish within {timeout} seconds.")
+            try:
+                result = worker.conn.recv()
+            except EOFError:
+                worker = self._replace_worker(worker)
+                raise RuntimeError(f"Plugin worker exited while generating '{plugin_id}'.")
+
+            worker.tasks += 1
+            if worker.tasks >= self.max_tasks:
+                logger.info(f"Recycling plugin worker. | pid: {worker.pid} | tasks: {worker.tasks}")
+                worker = self._replace_worker(worker, graceful=True)
+
+            if result[0] == "error":
+                _, message, worker_traceback = result
+                logger.error(f"Plugin failed in worker process. | plugin_id: {plugin_id}\n{worker_traceback}")
+                raise RuntimeError(message)
+
+            _, shm_name, mode, size, palette, updated_settings = result
+            settings.clear()
+            settings.update(updated_settings)
+            return _read_image(shm_name, mode, size, palette)
+        finally:
+            self.idle_workers.put(worker)
+
+    def _spawn_worker(self):
+        worker = PluginWorker(self.launcher)
+        self.workers.append(worker)
+        return worker
+
+    def _replace_worker(self, worker, graceful=False):
+        if graceful:
+            worker.stop()
+        else:
+            worker.kill()
+        with self.lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+            return self._spawn_worker()
+
+class PooledPlugin:
+    """Plugin wrapper that generates images in a PluginWorkerPool and delegates everything else to the plugin."""
+
+    def __init__(self, plugin, pool):
+        self.plugin = plugin
+        self.pool = pool
+
+    def generate_image(self, settings, device_config):
+        return self.pool.generate_image(self.plugin.config, settings, device_config)
+
+    def __getattr__(self, name):
+        return getattr(self.plugin, name)
+
+def _launcher_main(conn):
+    """Loop run in the launcher process: forks a worker for each launch request until told to stop."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # workers are not waited for, the kernel reaps them when they exit
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == "stop":
+                break
+
+            parent_conn, child_conn = multiprocessing.Pipe()
+            pid = os.fork()
+            if pid == 0:
+                # keep only the worker's end, so the worker sees EOF when the app goes away
+                conn.close()
+                parent_conn.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                exit_code = 0
+                try:
+                    _worker_main(child_conn)
+                except BaseException:
+                    traceback.print_exc()
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+
+            child_conn.close()
+            reduction.send_handle(conn, parent_conn.fileno(), None)
+            parent_conn.close()
+            conn.send(pid)
+    finally:
+        conn.close()
+
+def _worker_main(conn):
+    """Loop run in a worker process: generates images for render requests until told to stop."""
+    # the parent handles shutdown, and the inherited browser belongs to the parent
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    set_browser_service(None)
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == "stop":
+                break
+
+            _, plugin_id, settings, device_config = message
+            try:
+                if device_config.get_config("browser_service", default=True) and not get_browser_service():
+                    set_browser_service(BrowserService.from_config(device_config))
+                plugin = get_plugin_instance(device_config.get_plugin(plugin_id) or {"id": plugin_id})
+                image = plugin.generate_image(settings, device_config)
+                conn.send(("ok",) + _write_image(image) + (settings,))
+            except Exception as e:
+                conn.send(("error", str(e), traceback.format_exc()))
+    finally:
+        browser_service = get_browser_service()
+        if browser_service:
+            browser_service.stop()
+        conn.close()
+
+def _write_image(image):
+    """Copies the image into a new shared memory segment and returns (name, mode, size, palette)."""
+    data = image.tobytes()
+    shm = SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        shm.buf[:len(data)] = data
+    finally:
+        shm.close()
+    palette = image.getpalette() if image.mode == "P" else None
+    return (shm.name, image.mode, image.size, palette)
+
+def _read_image(shm_name, mode, size, palette):
+    """Copies an image out of a shared memory segment written by a worker and frees the segment."""
+    shm = SharedMemory(name=shm_name)
+    try:
+        image = Image.frombytes(mode, size, bytes(shm.buf[:_buffer_size(mode, size)]))
+    finally:
+        shm.close()
+        shm.unlink()
+    if palette:
+        image.putpalette(palette)
+    return image
+
+def _buffer_size(mode, size):
+    """Returns the number of bytes Image.tobytes produces for an image of this mode and size."""
+    return len(Image.new(mode, (size[0], 1)).tobytes()) * size[1]
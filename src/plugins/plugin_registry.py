@@ -1,16 +1,26 @@
 # app_registry.py
 
 import os
+import time
 import importlib
 import logging
+import threading
+import psutil
 from utils.app_utils import resolve_path
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 PLUGINS_DIR = 'plugins'
+# configs of the plugins that can be loaded, by id
+PLUGIN_CONFIGS = {}
+# plugin instances, created when a plugin is first used
 PLUGIN_CLASSES = {}
+# import cost of each loaded plugin module, by id
+IMPORT_REPORT = {}
+PLUGIN_IMPORT_LOCK = threading.Lock()
 
 def load_plugins(plugins_config):
+    """Registers the plugins, their modules are imported when a plugin is first used."""
     plugins_module_path = Path(resolve_path(PLUGINS_DIR))
     for plugin in plugins_config:
         plugin_id = plugin.get('id')
@@ -28,25 +38,55 @@ def load_plugins(plugins_config):
             logging.error(f"Could not find module path {module_path} for '{plugin_id}', skipping.")
             continue
 
-        module_name = f"plugins.{plugin_id}.{plugin_id}"
-        try:
-            module = importlib.import_module(module_name)
-            plugin_class = getattr(module, plugin.get("class"), None)
-
-            if plugin_class:
-                # Create an instance of the plugin class and add it to the plugin_classes dictionary
-                PLUGIN_CLASSES[plugin_id] = plugin_class(plugin)
-
-        except ImportError as e:
-            logging.error(f"Failed to import plugin module {module_name}: {e}")
+        PLUGIN_CONFIGS[plugin_id] = plugin
 
 def get_plugin_instance(plugin_config):
     plugin_id = plugin_config.get("id")
-    # Retrieve the plugin class factory function
+    # Retrieve the plugin instance, importing the plugin module on first use
     plugin_class = PLUGIN_CLASSES.get(plugin_id)
-    
+    if plugin_class is None and plugin_id in PLUGIN_CONFIGS:
+        plugin_class = _import_plugin(plugin_id)
+
     if plugin_class:
         # Initialize the plugin with its configuration
         return plugin_class
     else:
-        raise ValueError(f"Plugin '{plugin_id}' is not registered.")
\ No newline at end of file
+        raise ValueError(f"Plugin '{plugin_id}' is not registered.")
+
+def get_import_report():
+    """Returns the import time and resident memory growth of each plugin module loaded so far, most expensive first.
+
+    Modules shared between plugins are counted for the plugin that imported them first.
+    """
+    report = [{"plugin_id": plugin_id, **cost} for plugin_id, cost in IMPORT_REPORT.items()]
+    return sorted(report, key=lambda cost: cost["import_seconds"], reverse=True)
+
+def _import_plugin(plugin_id):
+    with PLUGIN_IMPORT_LOCK:
+        # another thread may have imported it while waiting for the lock
+        if plugin_id in PLUGIN_CLASSES:
+            return PLUGIN_CLASSES[plugin_id]
+
+        plugin = PLUGIN_CONFIGS[plugin_id]
+        module_name = f"plugins.{plugin_id}.{plugin_id}"
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            logging.error(f"Failed to import plugin module {module_name}: {e}")
+            # unregister it so later calls fail fast instead of retrying the import
+            PLUGIN_CONFIGS.pop(plugin_id, None)
+            return None
+
+        import_seconds = time.perf_counter() - start
+        rss_delta_mb = (process.memory_info().rss - rss_before) / (1024 * 1024)
+        IMPORT_REPORT[plugin_id] = {"import_seconds": round(import_seconds, 3), "rss_delta_mb": round(rss_delta_mb, 1)}
+        logger.info(f"Imported plugin module. | plugin_id: {plugin_id}, import_seconds: {import_seconds:.3f}, rss_delta_mb: {rss_delta_mb:.1f}")
+
+        plugin_class = getattr(module, plugin.get("class"), None)
+        if plugin_class:
+            # Create an instance of the plugin class and add it to the plugin_classes dictionary
+            PLUGIN_CLASSES[plugin_id] = plugin_class(plugin)
+        return PLUGIN_CLASSES.get(plugin_id)
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import logging
+import pytz
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+class RefreshScheduler:
+    """Keeps the times the refresh task has to wake up for in a min-heap.
+
+    Each timer has a unique key and a kind. Setting a timer for an existing key replaces it; replaced and
+    cancelled entries stay in the heap and are dropped lazily when they reach the top, so updates are O(log n).
+
+    A timer can fire ahead of its target time, e.g. a scheduled refresh fires early by the instance's estimated
+    render and display time so the new frame is on the panel at the scheduled time.
+
+    Timer kinds:
+        tick: the next plugin cycle tick.
+        prerender: when the next playlist item should start rendering.
+        playlist_boundary: a playlist start or end time.
+        scheduled_refresh: a plugin instance's daily scheduled refresh time.
+
+    Attributes:
+        heap (list): Heap of (timestamp, sequence, key) entries.
+        timers (dict): Maps each live key to its (timestamp, sequence, kind, target datetime).
+        playlist_keys (dict): Maps playlist names to the keys of the timers derived from that playlist.
+        instances (dict): Maps playlist names to their plugin instances by (plugin_id, name).
+        get_lead_seconds (callable): Returns how early a plugin instance's scheduled refresh should fire.
+    """
+
+    TICK = "tick"
+    PRERENDER = "prerender"
+    PLAYLIST_BOUNDARY = "playlist_boundary"
+    SCHEDULED_REFRESH = "scheduled_refresh"
+
+    def __init__(self, get_lead_seconds=None):
+        self.heap = []
+        self.timers = {}
+        self.playlist_keys = {}
+        self.instances = {}
+        self.counter = itertools.count()
+        self.get_lead_seconds = get_lead_seconds or (lambda plugin_instance: 0)
+
+    def set_timer(self, key, kind, when_dt, target_dt=None):
+        """Adds or replaces the timer for key, firing at when_dt on behalf of target_dt (defaults to when_dt)."""
+        timestamp = when_dt.timestamp()
+        current = self.timers.get(key)
+        if current and current[0] == timestamp and current[2] == kind:
+            return
+        sequence = next(self.counter)
+        self.timers[key] = (timestamp, sequence, kind, target_dt or when_dt)
+        heapq.heappush(self.heap, (timestamp, sequence, key))
+
+    def cancel(self, key):
+        """Removes the timer for key if it exists."""
+        self.timers.pop(key, None)
+
+    def next_wakeup(self):
+        """Returns the timestamp of the earliest live timer, or None if there are no timers."""
+        self._discard_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, current_dt):
+        """Removes and returns (kind, key, target datetime) for every timer due at current_dt, earliest first."""
+        timestamp = current_dt.timestamp()
+        due = []
+        self._discard_stale()
+        while self.heap and self.heap[0][0] <= timestamp:
+            _, _, key = heapq.heappop(self.heap)
+            _, _, kind, target_dt = self.timers.pop(key)
+            due.append((kind, key, target_dt))
+            self._discard_stale()
+        return due
+
+    def rebuild(self, playlist_manager, current_dt):
+        """Recomputes the playlist boundary and scheduled refresh timers for every playlist."""
+        for playlist_name in list(self.playlist_keys):
+            self.remove_playlist(playlist_name)
+        for playlist in playlist_manager.playlists:
+            self.update_playlist(playlist, current_dt)
+
+    def update_playlist(self, playlist, current_dt):
+        """Recomputes the timers derived from a single playlist, e.g. after it was created or edited."""
+        self.remove_playlist(playlist.name)
+
+        keys = set()
+        for boundary in (playlist.start_time, playlist.end_time):
+            key = (RefreshScheduler.PLAYLIST_BOUNDARY, playlist.name, boundary)
+            self.set_timer(key, RefreshScheduler.PLAYLIST_BOUNDARY, next_occurrence(boundary, current_dt))
+            keys.add(key)
+
+        for plugin_instance in playlist.plugins:
+            scheduled_time = plugin_instance.refresh.get("scheduled")
+            if scheduled_time:
+                key = (RefreshScheduler.SCHEDULED_REFRESH, playlist.name, plugin_instance.plugin_id, plugin_instance.name, scheduled_time)
+                self._set_scheduled_refresh(key, plugin_instance, current_dt)
+                keys.add(key)
+
+        self.playlist_keys[playlist.name] = keys
+        self.instances[playlist.name] = {(p.plugin_id, p.name): p for p in playlist.plugins}
+
+    def remove_playlist(self, playlist_name):
+        """Cancels the timers derived from a playlist, e.g. after it was deleted or renamed."""
+        self.instances.pop(playlist_name, None)
+        for key in self.playlist_keys.pop(playlist_name, set()):
+            self.cancel(key)
+
+    def rearm(self, kind, key, target_dt):
+        """Re-adds a daily timer that just fired for its next occurrence after target_dt. The time of day is the last key element."""
+        if kind not in (RefreshScheduler.PLAYLIST_BOUNDARY, RefreshScheduler.SCHEDULED_REFRESH):
+            return
+        if key not in self.playlist_keys.get(key[1], set()):
+            return
+        if kind == RefreshScheduler.PLAYLIST_BOUNDARY:
+            self.set_timer(key, kind, next_occurrence(key[-1], target_dt))
+        elif kind == RefreshScheduler.SCHEDULED_REFRESH:
+            plugin_instance = self.instances[key[1]].get((key[2], key[3]))
+            if plugin_instance:
+                self._set_scheduled_refresh(key, plugin_instance, target_dt)
+
+    def _set_scheduled_refresh(self, key, plugin_instance, after_dt):
+        """Sets the timer for the next scheduled refresh after after_dt, early by the instance's lead time."""
+        lead = timedelta(seconds=self.get_lead_seconds(plugin_instance))
+        target_dt = next_occurrence(key[-1], after_dt)
+        self.set_timer(key, RefreshScheduler.SCHEDULED_REFRESH, target_dt - lead, target_dt)
+
+    def _discard_stale(self):
+        while self.heap:
+            timestamp, sequence, key = self.heap[0]
+            current = self.timers.get(key)
+            if current and current[0] == timestamp and current[1] == sequence:
+                return
+            heapq.heappop(self.heap)
+
+def next_occurrence(time_str, current_dt):
+    """Returns the first datetime after current_dt whose local time is time_str ('HH:MM', '24:00' is midnight)."""
+    hour, minute = (int(part) for part in time_str.split(":"))
+    day = current_dt.date()
+    if hour == 24:
+        hour, minute = 0, 0
+        day += timedelta(days=1)
+
+    naive = datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+    candidate = localize(naive, current_dt.tzinfo)
+    if candidate <= current_dt:
+        candidate = localize(naive + timedelta(days=1), current_dt.tzinfo)
+    return candidate
+
+def localize(naive_dt, tzinfo):
+    """Attaches tzinfo to a naive datetime, using pytz's localize when available so DST offsets are correct."""
+    zone = getattr(tzinfo, "zone", None)
+    if zone:
+        return pytz.timezone(zone).localize(naive_dt)
+    return naive_dt.replace(tzinfo=tzinfo)
@@ -1,33 +1,66 @@
+import copy
 import threading
 import time
+import uuid
 import os
 import logging
-import psutil
 import pytz
-from datetime import datetime, timezone
+from collections import deque, OrderedDict
+from datetime import datetime, timezone, timedelta
 from plugins.plugin_registry import get_plugin_instance
-from utils.image_utils import compute_image_hash
+from utils.image_hash import compute_image_hash, compute_tile_signature, get_change_score
+from utils.app_utils import add_stale_badge
+from utils.metrics import PLUGIN_RENDER_SECONDS, PLUGIN_RENDERS_TOTAL, REFRESH_STAGE_SECONDS, REFRESHES_TOTAL
 from model import RefreshInfo, PlaylistManager
+from refresh_scheduler import RefreshScheduler
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# number of manual refresh jobs kept for status queries
+MAX_JOB_HISTORY = 20
+
+# seconds a playlist refresh waits for a plugin before showing the instance's previous image
+DEFAULT_RENDER_DEADLINE_SECONDS = 60
+
+# margin added to learned durations when deciding how early to start rendering
+ESTIMATE_SAFETY_FACTOR = 1.25
+ESTIMATE_SLACK_SECONDS = 5
+
+# renders that missed their deadline, by (playlist, plugin_id, instance), picked up on the instance's next refresh
+PENDING_RENDERS = {}
+PENDING_RENDERS_LOCK = threading.Lock()
+
 class RefreshTask:
     """Handles the logic for refreshing the display using a backgroud thread."""
 
-    def __init__(self, device_config, display_manager):
+    def __init__(self, device_config, display_manager, plugin_pool=None, stats_sampler=None):
         self.device_config = device_config
         self.display_manager = display_manager
+        # optional PluginWorkerPool, plugins generate images in worker processes when set
+        self.plugin_pool = plugin_pool
+        # SystemStatsSampler read by log_system_stats
+        self.stats_sampler = stats_sampler
 
         self.thread = None
         self.lock = threading.Lock()
         self.condition = threading.Condition(self.lock)
         self.running = False
-        self.manual_update_request = ()
 
-        self.refresh_event = threading.Event()
-        self.refresh_event.set()
-        self.refresh_result = {}
+        # manual refresh jobs waiting for the refresh thread, and recent jobs by id for status queries
+        self.job_queue = deque()
+        self.jobs = OrderedDict()
+
+        # look-ahead rendering of the next playlist item, see _start_prerender
+        self.last_interval_check = None
+        self.prerender = None
+        self.prerender_tick = None
+
+        # tile signature of the image on the panel, compared against by the refresh_change_threshold gate
+        self.displayed_signature = None
+
+        # wake-up times for cycle ticks, playlist boundaries and scheduled plugin refreshes
+        self.scheduler = RefreshScheduler(get_lead_seconds=self._get_scheduled_lead_seconds)
 
     def start(self):
         """Starts the background thread for refreshing the display."""
@@ -35,6 +68,10 @@ class RefreshTask:
             logger.info("Starting refresh task")
             self.thread = threading.Thread(target=self._run, daemon=True)
             self.running = True
+            # the first interval refresh happens one cycle after startup
+            self.last_interval_check = self._get_current_datetime()
+            with self.device_config.lock:
+                self.scheduler.rebuild(self.device_config.get_playlist_manager(), self.last_interval_check)
             self.thread.start()
 
     def stop(self):
@@ -49,119 +86,404 @@ class RefreshTask:
     def _run(self):
         """Background task that manages the periodic refresh of the display.
 
-        This function runs in a loop, sleeping for a configured duration (`plugin_cycle_interval_seconds`) or until
-        manually triggered via `manual_update()`. Detrmines the next plugin to refresh based on active playlists and 
-        updates the display accordingly.
+        This function runs in a loop, sleeping until the earliest timer in the scheduler (the next cycle tick,
+        a playlist boundary or a scheduled plugin refresh) or until a refresh job is queued via `manual_update()`.
+        Detrmines the next plugin to refresh based on active playlists and updates the display accordingly.
 
         Workflow:
-        1. Waits for the configured sleep duration or until notified of a manual update.
-        2. Checks if a manual update has been requested:
+        1. Waits until the earliest timer fires or until notified of a queued refresh job.
+        2. Checks if a refresh job has been queued:
         - If so, refreshes the specified plugin immediately.
-        3. Otherwise, determines the next plugin to refresh based on the active playlist and generates an image.
-        4. Compares the image hash with the last displayed image hash.
+        - If a playlist boundary changed the active playlist, or the displayed instance reached its scheduled
+          refresh time, refreshes immediately without waiting for the tick.
+        3. If woken ahead of the tick, starts rendering the predicted next plugin instance in the background.
+        4. Otherwise, determines the next plugin to refresh based on the active playlist and generates an image,
+           picking up the look-ahead render if it was started for that plugin instance.
+        5. Compares the image hash with the last displayed image hash.
         - If the image has changed, updates the display.
         - If the image is the same, skips the refresh.
-        5. Updates the refresh metadata in the device configuration.
-        6. Repeats the process until `stop()` is called.
+        - If a playlist plugin fails or misses its render deadline, its previous image is shown instead.
+        6. Updates the refresh metadata in the device configuration.
+        7. Repeats the process until `stop()` is called.
 
-        Handles any exceptions that occur during the refresh process and ensures the refresh event is set 
-        to indicate completion.
+        The lock is only held while deciding what to refresh, so web requests can queue jobs during a render.
 
         Exceptions:
         - Captures and logs any unexpected errors during execution to prevent the thread from exiting.
         """
         while True:
+            job = None
+            refresh_action = None
             try:
                 with self.condition:
-                    sleep_time = self.device_config.get_config("plugin_cycle_interval_seconds", default=60*60)
+                    sleep_time = self._get_sleep_seconds()
 
                     # Wait for sleep_time or until notified
-                    self.condition.wait(timeout=sleep_time)
-                    self.refresh_result = {}
-                    self.refresh_event.clear()
+                    if not self.job_queue:
+                        self.condition.wait(timeout=sleep_time)
 
                     # Exit if `stop()` is called
                     if not self.running:
                         break
 
-                    playlist_manager = self.device_config.get_playlist_manager()
-                    latest_refresh = self.device_config.get_refresh_info()
-                    current_dt = self._get_current_datetime()
-
-                    refresh_action = None
-                    if self.manual_update_request:
-                        # handle immediate update request
-                        logger.info("Manual update requested")
-                        refresh_action = self.manual_update_request
-                        self.manual_update_request = ()
-                    else:
-
-                        if self.device_config.get_config("log_system_stats"):
-                            self.log_system_stats()
-
-                        # handle refresh based on playlists
-                        logger.info(f"Running interval refresh check. | current_time: {current_dt.strftime('%Y-%m-%d %H:%M:%S')}")
-                        playlist, plugin_instance = self._determine_next_plugin(playlist_manager, latest_refresh, current_dt)
-                        if plugin_instance:
-                            refresh_action = PlaylistRefresh(playlist, plugin_instance)
-
-                    if refresh_action:
-                        plugin_config = self.device_config.get_plugin(refresh_action.get_plugin_id())
-                        if plugin_config is None:
-                            logger.error(f"Plugin config not found for '{refresh_action.get_plugin_id()}'.")
-                            continue
-                        plugin = get_plugin_instance(plugin_config)
-                        image = refresh_action.execute(plugin, self.device_config, current_dt)
-                        image_hash = compute_image_hash(image)
-
-                        refresh_info = refresh_action.get_refresh_info()
-                        refresh_info.update({"refresh_time": current_dt.isoformat(), "image_hash": image_hash})
-                        # check if image is the same as current image
-                        if image_hash != latest_refresh.image_hash:
-                            logger.info(f"Updating display. | refresh_info: {refresh_info}")
-                            self.display_manager.display_image(image, image_settings=plugin.config.get("image_settings", []))
+                    # the playlists are only read and advanced while holding the model lock
+                    with self.device_config.lock:
+                        playlist_manager = self.device_config.get_playlist_manager()
+                        latest_refresh = self.device_config.get_refresh_info()
+                        current_dt = self._get_current_datetime()
+
+                        refresh_action = None
+                        due_timers = self.scheduler.pop_due(current_dt)
+                        for kind, key, target_dt in due_timers:
+                            self.scheduler.rearm(kind, key, target_dt)
+
+                        if self.job_queue:
+                            # handle queued update request
+                            job = self.job_queue.popleft()
+                            logger.info(f"Manual update requested. | job_id: {job.job_id}")
+                            refresh_action = job.refresh_action
+                            job.set_status(RefreshJob.RENDERING)
+                            # the cycle restarts after a manual update, so a look-ahead render is for the wrong tick
+                            self._discard_prerender()
                         else:
-                            logger.info(f"Image already displayed, skipping refresh. | refresh_info: {refresh_info}")
+                            # playlist boundaries and scheduled refreshes do not wait for the cycle tick
+                            refresh_action = self._determine_timer_refresh(due_timers, playlist_manager, latest_refresh, current_dt)
+
+                            if not refresh_action:
+                                next_tick = self._get_next_tick(latest_refresh, current_dt)
+                                if current_dt < next_tick:
+                                    # woken ahead of the tick, render the next item so it is ready on time
+                                    if self._should_prerender(current_dt, next_tick):
+                                        self._start_prerender(playlist_manager, next_tick)
+                                    continue
+                                self.last_interval_check = current_dt
+
+                                if self.device_config.get_config("log_system_stats"):
+                                    self.log_system_stats()
 
-                        # update latest refresh data in the device config
-                        self.device_config.refresh_info = RefreshInfo(**refresh_info)
-                        self.device_config.write_config()
+                                # handle refresh based on playlists
+                                logger.info(f"Running interval refresh check. | current_time: {current_dt.strftime('%Y-%m-%d %H:%M:%S')}")
+                                playlist, plugin_instance = self._determine_next_plugin(playlist_manager, latest_refresh, current_dt)
+                                if plugin_instance:
+                                    refresh_action = PlaylistRefresh(playlist, plugin_instance)
+
+                        if refresh_action and not job:
+                            self._check_prerender(refresh_action)
+
+                if refresh_action:
+                    self._perform_refresh(refresh_action, current_dt, latest_refresh, job)
 
             except Exception as e:
                 logger.exception('Exception during refresh')
-                self.refresh_result["exception"] = e  # Capture exception
-            finally:
-                self.refresh_event.set()
+                if refresh_action:
+                    REFRESHES_TOTAL.inc(result="failed", **refresh_action.get_metric_labels())
+                if job:
+                    job.fail(e)
+
+    def _perform_refresh(self, refresh_action, current_dt, latest_refresh, job=None):
+        """Generates the image for a refresh action, updates the display if it changed and records the refresh."""
+        plugin_config = self.device_config.get_plugin(refresh_action.get_plugin_id())
+        if plugin_config is None:
+            raise RuntimeError(f"Plugin config not found for '{refresh_action.get_plugin_id()}'.")
+        plugin = self._get_plugin(plugin_config)
+        # plugins see one consistent version of the config for the whole cycle
+        config_snapshot = self.device_config.snapshot()
+        image = refresh_action.execute(plugin, config_snapshot, current_dt, self.device_config.lock)
+        metric_labels = refresh_action.get_metric_labels()
+        with REFRESH_STAGE_SECONDS.time(stage="hash", **metric_labels):
+            image_hash = compute_image_hash(image)
+
+        refresh_info = refresh_action.get_refresh_info()
+        refresh_info.update({"refresh_time": current_dt.isoformat(), "image_hash": image_hash})
+        # check if image is the same as current image
+        if job:
+            job.set_status(RefreshJob.DISPLAYING)
+        if image_hash == latest_refresh.image_hash:
+            logger.info(f"Image already displayed, skipping refresh. | refresh_info: {refresh_info}")
+            REFRESHES_TOTAL.inc(result="unchanged", **metric_labels)
+        elif not self._is_visible_change(image, job, metric_labels):
+            logger.info(f"Image changed below the refresh threshold, skipping refresh. | refresh_info: {refresh_info}")
+            REFRESHES_TOTAL.inc(result="below_threshold", **metric_labels)
+        else:
+            logger.info(f"Updating display. | refresh_info: {refresh_info}")
+            start = time.perf_counter()
+            self.display_manager.display_image(image, image_settings=plugin.config.get("image_settings", []), metric_labels=metric_labels)
+            display_seconds = time.perf_counter() - start
+            with self.device_config.lock:
+                refresh_action.record_display_duration(display_seconds)
+            REFRESHES_TOTAL.inc(result="displayed", **metric_labels)
+
+        # update latest refresh data, only the runtime state changed so the config file is not rewritten
+        with self.device_config.lock:
+            self.device_config.refresh_info = RefreshInfo(**refresh_info)
+        with REFRESH_STAGE_SECONDS.time(stage="write_state", **metric_labels):
+            self.device_config.write_state()
+        if job:
+            job.set_status(RefreshJob.DONE)
+
+    def _is_visible_change(self, image, job, metric_labels):
+        """Checks whether the image differs enough from the one on the panel to be worth a panel refresh.
+
+        Compares tile signatures against refresh_change_threshold, the share of tiles that must change. The
+        gate is off when the threshold is 0, and manual updates are always displayed. Changes are compared
+        against the last displayed image, so small changes that add up are displayed eventually.
+        """
+        threshold = self.device_config.get_config("refresh_change_threshold", default=0)
+        if not threshold:
+            self.displayed_signature = None
+            return True
+
+        with REFRESH_STAGE_SECONDS.time(stage="change_score", **metric_labels):
+            signature = compute_tile_signature(image)
+            change_score = get_change_score(self.displayed_signature, signature)
+        logger.debug(f"Computed change score. | change_score: {change_score:.4f}, threshold: {threshold}")
+        if change_score < threshold and job is None:
+            return False
+        self.displayed_signature = signature
+        return True
+
+    def _get_plugin(self, plugin_config):
+        """Returns the plugin for the config, wrapped to render in the worker pool if one is configured."""
+        plugin = get_plugin_instance(plugin_config)
+        if self.plugin_pool:
+            plugin = self.plugin_pool.wrap(plugin)
+        return plugin
 
     def manual_update(self, refresh_action):
-        """Manually triggers an update for the specified plugin id and plugin settings by notifying the background process."""
-        if self.running:
-            with self.condition:
-                self.manual_update_request = refresh_action
-                self.refresh_result = {}
-                self.refresh_event.clear()
+        """Queues an update for the specified refresh action and returns the RefreshJob tracking it.
 
-                self.condition.notify_all()  # Wake the thread to process manual update
+        Returns immediately. A request for the same plugin instance as a job that is still queued, or a playlist
+        refresh of an instance that is already rendering, is coalesced into that job.
+        """
+        if not self.running:
+            raise RuntimeError("Background refresh task is not running, unable to do a manual update")
 
-            self.refresh_event.wait()
-            if self.refresh_result.get("exception"):
-                raise self.refresh_result.get("exception")
-        else:
-            logger.warn("Background refresh task is not running, unable to do a manual update")
+        with self.condition:
+            job_key = refresh_action.get_job_key()
+            for job in list(self.job_queue) + list(self.jobs.values()):
+                if job.job_key != job_key or job.is_finished():
+                    continue
+                if job.status == RefreshJob.QUEUED:
+                    job.refresh_action = refresh_action  # latest settings win
+                    logger.info(f"Coalesced manual update into queued job. | job_id: {job.job_id}")
+                    return job
+                if isinstance(refresh_action, PlaylistRefresh):
+                    logger.info(f"Coalesced manual update into running job. | job_id: {job.job_id}")
+                    return job
+
+            job = RefreshJob(refresh_action)
+            self.job_queue.append(job)
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > MAX_JOB_HISTORY:
+                self.jobs.popitem(last=False)
+
+            self.condition.notify_all()  # Wake the thread to process manual update
+        return job
+
+    def get_job(self, job_id):
+        """Returns the RefreshJob with the given id, or None if it is unknown or has been pruned."""
+        return self.jobs.get(job_id)
 
     def signal_config_change(self):
-        """Notify the background thread that config has changed (e.g., interval updated)."""
+        """Notify the background thread that config has changed (e.g., interval updated).
+
+        A look-ahead render was started from the previous config, so it is discarded, and all playlist timers are recomputed since the timezone may have changed.
+        """
         if self.running:
             with self.condition:
+                self._discard_prerender()
+                with self.device_config.lock:
+                    self.scheduler.rebuild(self.device_config.get_playlist_manager(), self._get_current_datetime())
+                self.condition.notify_all()
+
+    def signal_playlist_change(self, *playlist_names):
+        """Notify the background thread that the given playlists were created, updated or deleted.
+
+        Only the timers of those playlists are recomputed. Pass both names when a playlist is renamed.
+        """
+        if self.running:
+            with self.condition:
+                self._discard_prerender()
+                playlist_manager = self.device_config.get_playlist_manager()
+                current_dt = self._get_current_datetime()
+                with self.device_config.lock:
+                    for playlist_name in playlist_names:
+                        playlist = playlist_manager.get_playlist(playlist_name)
+                        if playlist:
+                            self.scheduler.update_playlist(playlist, current_dt)
+                        else:
+                            self.scheduler.remove_playlist(playlist_name)
                 self.condition.notify_all()
 
+    def _discard_prerender(self):
+        """Drops the look-ahead render, so no refresh picks it up. A render still running finishes unused."""
+        if self.prerender:
+            key, render = self.prerender
+            with PENDING_RENDERS_LOCK:
+                if PENDING_RENDERS.get(key) is render:
+                    del PENDING_RENDERS[key]
+        self.prerender = None
+        self.prerender_tick = None
+
     def _get_current_datetime(self):
         """Retrieves the current datetime based on the device's configured timezone."""
         tz_str = self.device_config.get_config("timezone", default="UTC")
         return datetime.now(pytz.timezone(tz_str))
 
-    def _determine_next_plugin(self, playlist_manager, latest_refresh_info, current_dt):
-        """Determines the next plugin to refresh based on the active playlist, plugin cycle interval, and current time."""
+    def _get_next_tick(self, latest_refresh_info, current_dt):
+        """Returns the datetime at which the next interval refresh is due."""
+        plugin_cycle_interval = self.device_config.get_config("plugin_cycle_interval_seconds", default=3600)
+        latest_refresh_dt = latest_refresh_info.get_refresh_datetime()
+
+        next_tick = current_dt
+        if latest_refresh_dt:
+            next_tick = latest_refresh_dt + timedelta(seconds=plugin_cycle_interval)
+        # never check more than once per interval, e.g. when no playlist is active
+        if self.last_interval_check:
+            next_tick = max(next_tick, self.last_interval_check + timedelta(seconds=plugin_cycle_interval))
+        return next_tick
+
+    def _get_prerender_lead_seconds(self, next_tick):
+        """Returns how long before the tick the next playlist item should start rendering.
+
+        Uses the learned render duration of the instance expected at next_tick, or prerender_lead_seconds until
+        the instance has been rendered. Setting prerender_lead_seconds to 0 disables pre-rendering.
+        """
+        lead_seconds = self.device_config.get_config("prerender_lead_seconds", default=60)
+        if not lead_seconds or lead_seconds <= 0:
+            return 0
+
+        # building the minute table and reading the instance race with web requests editing the playlists
+        with self.device_config.lock:
+            playlist = self.device_config.get_playlist_manager().determine_active_playlist(next_tick)
+            if playlist and playlist.plugins:
+                estimate = playlist.peek_next_plugin().render_duration.get_estimate()
+                if estimate is not None:
+                    lead_seconds = estimate * ESTIMATE_SAFETY_FACTOR + ESTIMATE_SLACK_SECONDS
+        return lead_seconds
+
+    def _get_scheduled_lead_seconds(self, plugin_instance):
+        """Returns how long before its scheduled time a plugin instance should start refreshing to be on time."""
+        estimate = (plugin_instance.render_duration.get_estimate() or 0) + (plugin_instance.display_duration.get_estimate() or 0)
+        if not estimate:
+            return 0
+        return estimate * ESTIMATE_SAFETY_FACTOR + ESTIMATE_SLACK_SECONDS
+
+    def _get_sleep_seconds(self):
+        """Returns the time to wait until the earliest timer: the tick, pre-rendering, a playlist boundary or a scheduled refresh."""
+        with self.device_config.lock:
+            current_dt = self._get_current_datetime()
+            next_tick = self._get_next_tick(self.device_config.get_refresh_info(), current_dt)
+            self.scheduler.set_timer((RefreshScheduler.TICK,), RefreshScheduler.TICK, next_tick)
+
+            prerender_dt = next_tick - timedelta(seconds=self._get_prerender_lead_seconds(next_tick))
+            if self._should_prerender(max(current_dt, prerender_dt), next_tick):
+                self.scheduler.set_timer((RefreshScheduler.PRERENDER,), RefreshScheduler.PRERENDER, max(current_dt, prerender_dt))
+            else:
+                self.scheduler.cancel((RefreshScheduler.PRERENDER,))
+
+        return max(self.scheduler.next_wakeup() - current_dt.timestamp(), 0)
+
+    def _should_prerender(self, current_dt, next_tick):
+        """Returns True if the next item should start rendering now so it is ready for next_tick."""
+        lead_seconds = self._get_prerender_lead_seconds(next_tick)
+        if not lead_seconds or lead_seconds <= 0:
+            return False
+        if self.prerender_tick == next_tick:
+            return False  # already rendering (or rendered) for this tick
+        return next_tick - timedelta(seconds=lead_seconds) <= current_dt < next_tick
+
+    def _start_prerender(self, playlist_manager, next_tick):
+        """Predicts the plugin instance that will be shown at next_tick and starts rendering it in the background.
+
+        The prediction follows Playlist.get_next_plugin without advancing the playlist. Only instances that
+        need a fresh image are rendered, the others load their latest image from disk at the tick anyway. The
+        render is registered in PENDING_RENDERS, so the refresh at the tick waits for it like for any render
+        that missed its deadline, within the instance's render deadline and with circuit breaker bookkeeping.
+        """
+        self._discard_prerender()
+        self.prerender_tick = next_tick
+
+        playlist = playlist_manager.determine_active_playlist(next_tick)
+        if not playlist or not playlist.plugins:
+            return
+        plugin_instance = playlist.peek_next_plugin()
+        if not plugin_instance.should_refresh(next_tick) or plugin_instance.circuit_breaker.is_open(next_tick):
+            return
+
+        plugin_config = self.device_config.get_plugin(plugin_instance.plugin_id)
+        if plugin_config is None:
+            return
+        try:
+            plugin = self._get_plugin(plugin_config)
+        except Exception:
+            logger.exception(f"Failed to load plugin for pre-rendering, rendering on the tick instead. | plugin_instance: {plugin_instance.name}")
+            return
+
+        refresh_action = PlaylistRefresh(playlist, plugin_instance)
+        key = refresh_action.get_stage_key()
+        with PENDING_RENDERS_LOCK:
+            if key in PENDING_RENDERS:
+                return  # a render that missed its deadline is still running, the tick picks it up
+            logger.info(f"Pre-rendering next plugin instance. | playlist: {playlist.name} | plugin_instance: {plugin_instance.name} | tick: {next_tick.strftime('%H:%M:%S')}")
+            plugin_instance.circuit_breaker.before_render()
+            render = BackgroundRender(plugin, plugin_instance.settings, self.device_config.snapshot(),
+                                      self._get_current_datetime(), refresh_action.get_metric_labels())
+            PENDING_RENDERS[key] = render
+        self.prerender = (key, render)
+
+    def _check_prerender(self, refresh_action):
+        """Keeps the look-ahead render for the refresh action's plugin instance, discarding it if the prediction missed."""
+        if not self.prerender:
+            return
+        key, _ = self.prerender
+        if not isinstance(refresh_action, PlaylistRefresh) or refresh_action.get_stage_key() != key:
+            logger.info("Discarding look-ahead render of another plugin instance.")
+            self._discard_prerender()
+            return
+        # the refresh waits for it through PENDING_RENDERS
+        self.prerender = None
+        self.prerender_tick = None
+
+    def _determine_timer_refresh(self, due_timers, playlist_manager, latest_refresh_info, current_dt):
+        """Returns the refresh action for timers that fired between ticks, or None if none of them needs one.
+
+        - A playlist boundary that changes the active playlist shows the next plugin of the new playlist immediately.
+        - A scheduled refresh of the plugin instance currently displayed refreshes it in place, starting early
+          enough that the new image is displayed at the scheduled time.
+        """
+        due_kinds = {kind for kind, _, _ in due_timers}
+
+        if RefreshScheduler.PLAYLIST_BOUNDARY in due_kinds:
+            playlist = playlist_manager.determine_active_playlist(current_dt)
+            active_playlist = playlist.name if playlist else None
+            if active_playlist != playlist_manager.active_playlist:
+                logger.info(f"Playlist boundary reached. | previous_playlist: {playlist_manager.active_playlist} | active_playlist: {active_playlist}")
+                playlist, plugin_instance = self._determine_next_plugin(playlist_manager, latest_refresh_info, current_dt, force=True)
+                if plugin_instance:
+                    return PlaylistRefresh(playlist, plugin_instance)
+                return None
+
+        for kind, key, target_dt in due_timers:
+            if kind != RefreshScheduler.SCHEDULED_REFRESH:
+                continue
+            _, playlist_name, plugin_id, instance_name, _ = key
+            if (playlist_name, plugin_id, instance_name) != (latest_refresh_info.playlist, latest_refresh_info.plugin_id, latest_refresh_info.plugin_instance):
+                continue  # instances not on screen pick up the new image on their next turn
+            playlist = playlist_manager.get_playlist(playlist_name)
+            plugin_instance = playlist.find_plugin(plugin_id, instance_name) if playlist else None
+            if plugin_instance:
+                logger.info(f"Scheduled refresh of displayed plugin instance. | plugin_instance: {instance_name} | scheduled: {target_dt.strftime('%H:%M')}")
+                # the timer fires early by the estimated render time, refresh as of the scheduled time
+                return PlaylistRefresh(playlist, plugin_instance, refresh_dt=target_dt)
+
+        return None
+
+    def _determine_next_plugin(self, playlist_manager, latest_refresh_info, current_dt, force=False):
+        """Determines the next plugin to refresh based on the active playlist, plugin cycle interval, and current time.
+
+        If force is set the plugin cycle interval is ignored, e.g. when a playlist boundary is reached.
+        """
         playlist = playlist_manager.determine_active_playlist(current_dt)
         if not playlist:
             playlist_manager.active_playlist = None
@@ -177,31 +499,63 @@ class RefreshTask:
         plugin_cycle_interval = self.device_config.get_config("plugin_cycle_interval_seconds", default=3600)
         should_refresh = PlaylistManager.should_refresh(latest_refresh_dt, plugin_cycle_interval, current_dt)
 
-        if not should_refresh:
+        if not should_refresh and not force:
             latest_refresh_str = latest_refresh_dt.strftime('%Y-%m-%d %H:%M:%S') if latest_refresh_dt else "None"
             logger.info(f"Not time to update display. | latest_update: {latest_refresh_str} | plugin_cycle_interval: {plugin_cycle_interval}")
             return None, None
 
-        plugin = playlist.get_next_plugin()
+        plugin = self._get_next_closed_circuit_plugin(playlist, current_dt)
         logger.info(f"Determined next plugin. | active_playlist: {playlist.name} | plugin_instance: {plugin.name}")
 
         return playlist, plugin
+
+    def _get_next_closed_circuit_plugin(self, playlist, current_dt):
+        """Advances the playlist past instances that need a new image while their circuit breaker is open.
+
+        If every instance is skipped, the first one is returned and shows its previous image.
+        """
+        first_index = None
+        for _ in range(len(playlist.plugins)):
+            plugin = playlist.get_next_plugin()
+            if first_index is None:
+                first_index = playlist.current_plugin_index
+            if not (plugin.circuit_breaker.is_open(current_dt) and plugin.should_refresh(current_dt)):
+                return plugin
+            logger.info(f"Skipping plugin instance with open circuit. | plugin_instance: {plugin.name} | retry_time: {plugin.circuit_breaker.retry_time}")
+
+        playlist.current_plugin_index = first_index
+        return playlist.plugins[first_index]
     
     def log_system_stats(self):
-        metrics = {
-            'cpu_percent': psutil.cpu_percent(interval=1),
-            'memory_percent': psutil.virtual_memory().percent,
-            'disk_percent': psutil.disk_usage('/').percent,
-            'load_avg_1_5_15': os.getloadavg(),
-            'swap_percent': psutil.swap_memory().percent,
-            'net_io': {
-                'bytes_sent': psutil.net_io_counters().bytes_sent,
-                'bytes_recv': psutil.net_io_counters().bytes_recv
-            }
-        }
+        """Logs the latest sample from the system stats sampler."""
+        metrics = self.stats_sampler.get_latest() if self.stats_sampler else None
+        if metrics is None:
+            logger.info("System Stats: no sample available yet.")
+            return
 
         logger.info(f"System Stats: {metrics}")
 
+def get_circuit_breaker_settings(device_config):
+    """Returns the CircuitBreaker.record_failure threshold and backoff settings from the device config."""
+    return {
+        "failure_threshold": device_config.get_config("circuit_breaker_failure_threshold", default=3),
+        "base_backoff": device_config.get_config("circuit_breaker_base_backoff_seconds", default=60),
+        "max_backoff": device_config.get_config("circuit_breaker_max_backoff_seconds", default=3600)
+    }
+
+def generate_image(plugin, settings, device_config, metric_labels):
+    """Calls the plugin's generate_image, recording its duration and result in the metrics."""
+    start = time.perf_counter()
+    try:
+        image = plugin.generate_image(settings, device_config)
+    except Exception:
+        PLUGIN_RENDERS_TOTAL.inc(result="error", **metric_labels)
+        raise
+    finally:
+        PLUGIN_RENDER_SECONDS.observe(time.perf_counter() - start, **metric_labels)
+    PLUGIN_RENDERS_TOTAL.inc(result="success", **metric_labels)
+    return image
+
 class RefreshAction:
     """Base class for a refresh action. Subclasses should override the methods below."""
     
@@ -217,6 +571,18 @@ class RefreshAction:
         """Return the plugin ID associated with this refresh."""
         raise NotImplementedError("Subclasses must implement the get_plugin_id method.")
 
+    def get_job_key(self):
+        """Return a key identifying refreshes that can be coalesced into one job."""
+        raise NotImplementedError("Subclasses must implement the get_job_key method.")
+
+    def get_metric_labels(self):
+        """Return the plugin id and instance labels for metrics of this refresh."""
+        raise NotImplementedError("Subclasses must implement the get_metric_labels method.")
+
+    def record_display_duration(self, seconds):
+        """Record how long the display update for this refresh took."""
+        raise NotImplementedError("Subclasses must implement the record_display_duration method.")
+
 class ManualRefresh(RefreshAction):
     """Performs a manual refresh based on a plugin's ID and its associated settings.
     
@@ -229,9 +595,9 @@ class ManualRefresh(RefreshAction):
         self.plugin_id = plugin_id
         self.plugin_settings = plugin_settings
 
-    def execute(self, plugin, device_config, current_dt: datetime):
+    def execute(self, plugin, device_config, current_dt: datetime, model_lock):
         """Performs a manual refresh using the stored plugin ID and settings."""
-        return plugin.generate_image(self.plugin_settings, device_config)
+        return generate_image(plugin, self.plugin_settings, device_config, self.get_metric_labels())
 
     def get_refresh_info(self):
         """Return refresh metadata as a dictionary."""
@@ -241,18 +607,33 @@ class ManualRefresh(RefreshAction):
         """Return the plugin ID associated with this refresh."""
         return self.plugin_id
 
+    def get_job_key(self):
+        """Return a key identifying refreshes that can be coalesced into one job."""
+        return ("Manual Update", self.plugin_id)
+
+    def get_metric_labels(self):
+        """Return the plugin id and instance labels for metrics of this refresh."""
+        return {"plugin_id": self.plugin_id, "plugin_instance": ""}
+
+    def record_display_duration(self, seconds):
+        """Manual updates are not tied to a plugin instance, so their durations are only in the metrics."""
+        pass
+
 class PlaylistRefresh(RefreshAction):
     """Performs a refresh using a plugin instance within a playlist context.
 
     Attributes:
         playlist: The playlist object associated with the refresh.
         plugin_instance: The plugin instance to refresh.
+        force (bool): Generate a new image even if the instance is not due for a refresh.
+        refresh_dt (datetime): Time the refresh is for if it was started ahead of time, e.g. a scheduled refresh.
     """
 
-    def __init__(self, playlist, plugin_instance, force=False):
+    def __init__(self, playlist, plugin_instance, force=False, refresh_dt=None):
         self.playlist = playlist
         self.plugin_instance = plugin_instance
         self.force = force
+        self.refresh_dt = refresh_dt
 
     def get_refresh_info(self):
         """Return refresh metadata as a dictionary."""
@@ -267,22 +648,209 @@ class PlaylistRefresh(RefreshAction):
         """Return the plugin ID associated with this refresh."""
         return self.plugin_instance.plugin_id
 
-    def execute(self, plugin, device_config, current_dt: datetime):
-        """Performs a refresh for the specified plugin instance within its playlist context."""
+    def get_job_key(self):
+        """Return a key identifying refreshes that can be coalesced into one job."""
+        return ("Playlist", self.playlist.name, self.plugin_instance.plugin_id, self.plugin_instance.name)
+
+    def get_metric_labels(self):
+        """Return the plugin id and instance labels for metrics of this refresh."""
+        return {"plugin_id": self.plugin_instance.plugin_id, "plugin_instance": self.plugin_instance.name}
+
+    def record_display_duration(self, seconds):
+        """Record how long the display update for this refresh took."""
+        self.plugin_instance.display_duration.record(seconds)
+
+    def get_stage_key(self):
+        """Return the key identifying renders of this plugin instance in PENDING_RENDERS."""
+        return (self.playlist.name, self.plugin_instance.plugin_id, self.plugin_instance.name)
+
+    def execute(self, plugin, device_config, current_dt: datetime, model_lock):
+        """Performs a refresh for the specified plugin instance within its playlist context.
+
+        The instance's state is only read and updated while holding model_lock, the device config's lock.
+        """
         # Determine the file path for the plugin's image
         plugin_image_path = os.path.join(device_config.plugin_image_dir, self.plugin_instance.get_image_path())
+        current_dt = self.refresh_dt or current_dt
 
         # Check if a refresh is needed based on the plugin instance's criteria
         if self.plugin_instance.should_refresh(current_dt) or self.force:
             logger.info(f"Refreshing plugin instance. | plugin_instance: '{self.plugin_instance.name}'") 
-            # Generate a new image
-            image = plugin.generate_image(self.plugin_instance.settings, device_config)
-            image.save(plugin_image_path)
-            self.plugin_instance.latest_refresh_time = current_dt.isoformat()
+            image = self._render_with_deadline(plugin, device_config, current_dt, plugin_image_path, model_lock)
         else:
             logger.info(f"Not time to refresh plugin instance, using latest image. | plugin_instance: {self.plugin_instance.name}.")
             # Load the existing image from disk
             with Image.open(plugin_image_path) as img:
                 image = img.copy()
 
-        return image
\ No newline at end of file
+        return image
+
+    def get_render_deadline(self, device_config):
+        """Return the seconds to wait for the plugin, from the instance's refresh settings or the device config.
+
+        None or 0 waits for the plugin however long it takes.
+        """
+        deadline = self.plugin_instance.refresh.get("render_deadline")
+        if deadline is None:
+            deadline = device_config.get_config("plugin_render_deadline_seconds", default=DEFAULT_RENDER_DEADLINE_SECONDS)
+        return deadline or None
+
+    def _render_with_deadline(self, plugin, device_config, current_dt, plugin_image_path, model_lock):
+        """Generates a new image, falling back to the previous image if the plugin fails or misses its deadline.
+
+        A render that misses the deadline keeps running in the background and is used on the instance's next
+        refresh instead of starting a new one. Failures and missed deadlines are recorded in the instance's
+        circuit breaker, while the circuit is open the plugin is not called unless the refresh is forced.
+        """
+        key = self.get_stage_key()
+        # the model lock is taken before PENDING_RENDERS_LOCK, as the refresh thread does when it starts a look-ahead render
+        with model_lock, PENDING_RENDERS_LOCK:
+            circuit_breaker = self.plugin_instance.circuit_breaker
+            render = PENDING_RENDERS.get(key)
+            circuit_open = render is None and circuit_breaker.is_open(current_dt) and not self.force
+            if circuit_open:
+                error = RuntimeError(f"Circuit open for plugin instance '{self.plugin_instance.name}' until {circuit_breaker.retry_time}.")
+            elif render is None:
+                circuit_breaker.before_render()
+                render = BackgroundRender(plugin, self.plugin_instance.settings, device_config, current_dt, self.get_metric_labels())
+                PENDING_RENDERS[key] = render
+            else:
+                logger.info(f"Waiting for render started on a previous refresh. | plugin_instance: '{self.plugin_instance.name}'")
+        if circuit_open:
+            return self._load_previous_image(device_config, plugin_image_path, error)
+
+        deadline = self.get_render_deadline(device_config)
+        if render.wait(deadline):
+            with PENDING_RENDERS_LOCK:
+                PENDING_RENDERS.pop(key, None)
+            if render.error is None:
+                render.image.save(plugin_image_path)
+                with model_lock:
+                    render.apply_settings(self.plugin_instance)
+                    self.plugin_instance.latest_refresh_time = render.rendered_dt.isoformat()
+                    self.plugin_instance.render_duration.record(render.duration)
+                    circuit_breaker.record_success()
+                return render.image
+            error = render.error
+        else:
+            error = RuntimeError(f"Plugin instance '{self.plugin_instance.name}' did not render within {deadline} seconds.")
+
+        with model_lock:
+            circuit_breaker.record_failure(current_dt, error, **get_circuit_breaker_settings(device_config))
+        return self._load_previous_image(device_config, plugin_image_path, error)
+
+    def _load_previous_image(self, device_config, plugin_image_path, error):
+        """Returns the instance's latest image with a stale badge, or raises error if there is none."""
+        if not os.path.exists(plugin_image_path):
+            raise error
+        logger.warning(f"Showing previous image of plugin instance. | plugin_instance: '{self.plugin_instance.name}' | error: {error}")
+        with Image.open(plugin_image_path) as img:
+            image = img.copy()
+        stale_since = self.plugin_instance.get_latest_refresh_dt()
+        if stale_since and device_config.get_config("stale_image_badge", default=True):
+            image = add_stale_badge(image, stale_since)
+        return image
+
+class BackgroundRender:
+    """A plugin render running in its own thread, so the refresh can stop waiting for it at a deadline.
+
+    The plugin renders with a copy of the instance's settings, so it never changes the model outside the
+    model lock. The settings it updates, e.g. an image index, are copied back by apply_settings.
+
+    Attributes:
+        image (PIL.Image): The generated image once the render succeeded.
+        error (Exception): The exception raised by the plugin if the render failed.
+        rendered_dt (datetime): Time the render was started.
+        duration (float): Seconds the plugin took, once the render finished.
+    """
+
+    def __init__(self, plugin, settings, device_config, rendered_dt, metric_labels):
+        self.source_settings = settings
+        self.settings = copy.deepcopy(settings)
+        self.image = None
+        self.error = None
+        self.rendered_dt = rendered_dt
+        self.duration = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(plugin, self.settings, device_config, metric_labels), daemon=True)
+        self.thread.start()
+
+    def wait(self, timeout=None):
+        """Waits for the render to finish, returns False if it is still running after timeout seconds."""
+        return self.done.wait(timeout)
+
+    def apply_settings(self, plugin_instance):
+        """Copies the settings the plugin updated back to the instance, unless they were replaced during the render.
+
+        Must hold the model lock.
+        """
+        if plugin_instance.settings is self.source_settings:
+            plugin_instance.settings.update(self.settings)
+
+    def _run(self, plugin, settings, device_config, metric_labels):
+        start = time.perf_counter()
+        try:
+            self.image = generate_image(plugin, settings, device_config, metric_labels)
+        except Exception as e:
+            logger.exception("Failed to generate plugin image")
+            self.error = e
+        finally:
+            self.duration = time.perf_counter() - start
+            self.done.set()
+
+class RefreshJob:
+    """Tracks a manual refresh through the refresh thread.
+
+    Attributes:
+        job_id (str): Unique id returned to the web UI for status queries.
+        job_key (tuple): Key of the refresh action, used to coalesce repeated requests.
+        refresh_action (RefreshAction): The refresh to perform.
+        status (str): One of 'queued', 'rendering', 'displaying', 'done' or 'failed'.
+        error (str): Error message if the job failed.
+        timings (dict): Seconds spent in each stage that has finished.
+    """
+
+    QUEUED = "queued"
+    RENDERING = "rendering"
+    DISPLAYING = "displaying"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, refresh_action):
+        self.job_id = uuid.uuid4().hex
+        self.job_key = refresh_action.get_job_key()
+        self.refresh_action = refresh_action
+        self.status = RefreshJob.QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.stage_started_at = time.monotonic()
+        self.timings = {}
+
+    def set_status(self, status):
+        """Moves the job to a new stage, recording how long the previous stage took."""
+        now = time.monotonic()
+        self.timings[self.status] = round(now - self.stage_started_at, 3)
+        self.stage_started_at = now
+        self.status = status
+
+    def fail(self, exception):
+        """Marks the job as failed with the given exception."""
+        self.error = str(exception)
+        self.set_status(RefreshJob.FAILED)
+
+    def is_finished(self):
+        """Returns True if the job is done or failed."""
+        return self.status in (RefreshJob.DONE, RefreshJob.FAILED)
+
+    def to_dict(self):
+        refresh_info = self.refresh_action.get_refresh_info()
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "plugin_id": refresh_info.get("plugin_id"),
+            "playlist": refresh_info.get("playlist"),
+            "plugin_instance": refresh_info.get("plugin_instance"),
+            "created_at": self.created_at,
+            "timings": self.timings
+        }
@@ -0,0 +1,100 @@
+import os
+import json
+import logging
+import threading
+from config_persister import write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_THRESHOLD = 500
+
+class StateJournal:
+    """Append-only journal of runtime state, kept in memory and replayed on startup.
+
+    State is a mapping of keys (tuples of strings) to JSON values. Each change appends one line to the
+    journal file, so a write costs the size of the changed values rather than of the whole state. Once
+    the journal holds compact_threshold more records than there are live keys, it is rewritten atomically
+    with a single record per key.
+
+    Attributes:
+        path (str): Journal file.
+        state (dict): Current value of every key.
+        compact_threshold (int): Number of superseded records that triggers a compaction.
+    """
+
+    def __init__(self, path, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self.lock = threading.Lock()
+        self.state = {}
+        self.record_count = 0
+        self.load()
+
+    def load(self):
+        """Replays the journal file into memory."""
+        self.state = {}
+        self.record_count = 0
+        if not os.path.isfile(self.path):
+            return
+
+        corrupt = False
+        with open(self.path) as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn final line from a power loss, everything before it is intact
+                    logger.warning(f"Ignoring unreadable state journal record. | path: {self.path}, line: {line_number}")
+                    corrupt = True
+                    continue
+                self._apply(tuple(record["key"]), record.get("value"), record.get("deleted", False))
+                self.record_count += 1
+        logger.debug(f"Loaded state journal. | path: {self.path}, keys: {len(self.state)}, records: {self.record_count}")
+
+        if corrupt:
+            # rewrite the file so new records are not appended to the torn line
+            self._compact()
+
+    def get(self, key, default=None):
+        """Returns the value of a key."""
+        return self.state.get(key, default)
+
+    def items(self):
+        """Returns a list of the (key, value) pairs in the state."""
+        with self.lock:
+            return list(self.state.items())
+
+    def update(self, state):
+        """Replaces the whole state, appending records only for the keys that changed or were removed."""
+        with self.lock:
+            records = [{"key": list(key), "value": value} for key, value in state.items() if self.state.get(key, Ellipsis) != value]
+            records.extend({"key": list(key), "deleted": True} for key in self.state if key not in state)
+            if not records:
+                return
+
+            for record in records:
+                self._apply(tuple(record["key"]), record.get("value"), record.get("deleted", False))
+
+            if self.record_count + len(records) - len(self.state) >= self.compact_threshold:
+                self._compact()
+            else:
+                self._append(records)
+
+    def _apply(self, key, value, deleted):
+        if deleted:
+            self.state.pop(key, None)
+        else:
+            self.state[key] = value
+
+    def _append(self, records):
+        with open(self.path, 'a') as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        self.record_count += len(records)
+
+    def _compact(self):
+        logger.debug(f"Compacting state journal. | path: {self.path}, keys: {len(self.state)}")
+        data = "".join(json.dumps({"key": list(key), "value": value}) + "\n" for key, value in self.state.items())
+        write_atomic(self.path, data)
+        self.record_count = len(self.state)
@@ -0,0 +1,14 @@
+// Function to poll a queued refresh job until the display has been updated or the job failed
+async function waitForRefreshJob(statusUrl, pollIntervalMs = 1000) {
+    while (true) {
+        const response = await fetch(statusUrl, {cache: 'no-store'});
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error);
+        }
+        if (job.status === 'done' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+    }
+}
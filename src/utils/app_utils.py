@@ -119,6 +119,21 @@ def generate_startup_image(dimensions=(800,480)):
 
     return image
 
+def add_stale_badge(image, stale_since):
+    """Returns a copy of the image with a 'Stale since' badge in the bottom right corner."""
+    image = image.convert("RGB")
+    width, height = image.size
+    image_draw = ImageDraw.Draw(image)
+
+    text = f"Stale since {stale_since.strftime('%H:%M')}"
+    font = get_font("Jost", max(int(height * 0.04), 10))
+    padding = max(int(height * 0.01), 2)
+    left, top, right, bottom = image_draw.textbbox((width - padding * 2, height - padding * 2), text, anchor="rb", font=font)
+    image_draw.rectangle((left - padding, top - padding, right + padding, bottom + padding), fill=(0,0,0))
+    image_draw.text((width - padding * 2, height - padding * 2), text, anchor="rb", fill=(255,255,255), font=font)
+
+    return image
+
 def parse_form(request_form):
     request_dict = request_form.to_dict()
     for key in request_form.keys():
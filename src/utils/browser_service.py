@@ -0,0 +1,410 @@
+import os
+import json
+import queue
+import base64
+import logging
+import shutil
+import threading
+import subprocess
+import psutil
+
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CHROMIUM_BINARY = "chromium-headless-shell"
+CHROMIUM_ARGS = [
+    "--headless",
+    "--remote-debugging-pipe",
+    "--no-sandbox",
+    "--disable-gpu",
+    "--disable-software-rasterizer",
+    "--disable-background-networking",
+    "--disable-dev-shm-usage",
+    "--hide-scrollbars",
+    "--disable-extensions",
+    "--disable-plugins",
+    "--mute-audio",
+    "--js-flags=--max_old_space_size=128"
+]
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_RENDERS = 50
+DEFAULT_MAX_RSS_MB = 250
+DEFAULT_RENDER_TIMEOUT_SECONDS = 60
+
+# file descriptors chromium uses for the DevTools pipe transport
+PIPE_READ_FD = 3
+PIPE_WRITE_FD = 4
+# moves the pipe ends the shell gets as stdin and stdout to those descriptors, then runs chromium in its place
+PIPE_FD_WRAPPER = f'exec {PIPE_READ_FD}<&0 {PIPE_WRITE_FD}>&1 0</dev/null 1>/dev/null; exec "$@"'
+
+_browser_service = None
+
+class BrowserServiceError(Exception):
+    """Raised when the persistent browser cannot complete a render."""
+
+class DevToolsPipe:
+    """Minimal DevTools protocol client over chromium's --remote-debugging-pipe transport.
+
+    Messages are JSON objects terminated by a null byte. Commands are matched to their responses
+    by id, events are delivered to waiters registered for a (session_id, method) pair.
+    """
+
+    def __init__(self, read_fd, write_fd):
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.pending = {}
+        self.event_waiters = []
+        self.closed = threading.Event()
+
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def send(self, method, params=None, session_id=None, timeout=DEFAULT_RENDER_TIMEOUT_SECONDS):
+        """Sends a command and blocks until its response arrives."""
+        if self.closed.is_set():
+            raise BrowserServiceError("DevTools pipe is closed.")
+
+        waiter = {"event": threading.Event(), "response": None}
+        with self.lock:
+            self.next_id += 1
+            message = {"id": self.next_id, "method": method, "params": params or {}}
+            if session_id:
+                message["sessionId"] = session_id
+            self.pending[self.next_id] = waiter
+            try:
+                os.write(self.write_fd, json.dumps(message).encode("utf-8") + b"\0")
+            except OSError as e:
+                self.pending.pop(self.next_id, None)
+                raise BrowserServiceError(f"Failed to write to DevTools pipe: {e}")
+
+        if not waiter["event"].wait(timeout) or waiter["response"] is None:
+            raise BrowserServiceError(f"Timed out waiting for DevTools response to {method}.")
+
+        response = waiter["response"]
+        if "error" in response:
+            raise BrowserServiceError(f"DevTools error for {method}: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    def expect_event(self, session_id, method):
+        """Registers interest in an event before the command that triggers it is sent."""
+        waiter = {"session_id": session_id, "method": method, "event": threading.Event()}
+        with self.lock:
+            self.event_waiters.append(waiter)
+        return waiter
+
+    def wait_event(self, waiter, timeout):
+        """Waits for a registered event, returns True if it fired within the timeout."""
+        fired = waiter["event"].wait(timeout)
+        with self.lock:
+            if waiter in self.event_waiters:
+                self.event_waiters.remove(waiter)
+        return fired
+
+    def close(self):
+        """Closes the pipe and releases anything still waiting on it."""
+        self.closed.set()
+        for fd in (self.write_fd, self.read_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._release_waiters()
+
+    def _release_waiters(self):
+        with self.lock:
+            for waiter in self.pending.values():
+                waiter["event"].set()
+            self.pending.clear()
+            for waiter in self.event_waiters:
+                waiter["event"].set()
+
+    def _read_loop(self):
+        buffer = b""
+        while not self.closed.is_set():
+            try:
+                chunk = os.read(self.read_fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+
+            buffer += chunk
+            while b"\0" in buffer:
+                raw, buffer = buffer.split(b"\0", 1)
+                try:
+                    self._dispatch(json.loads(raw))
+                except ValueError:
+                    logger.warning("Discarding malformed DevTools message")
+
+        self.closed.set()
+        self._release_waiters()
+
+    def _dispatch(self, message):
+        with self.lock:
+            if "id" in message:
+                waiter = self.pending.pop(message["id"], None)
+                if waiter:
+                    waiter["response"] = message
+                    waiter["event"].set()
+                return
+
+            for waiter in self.event_waiters:
+                if waiter["method"] == message.get("method") and waiter["session_id"] == message.get("sessionId"):
+                    waiter["event"].set()
+
+class BrowserService:
+    """Long-lived headless chromium used to render HTML and URLs to images.
+
+    The browser is started lazily and driven over the DevTools protocol. A small pool of pages is
+    kept attached so consecutive renders skip the chromium cold start. A memory watchdog recycles
+    the browser once it has served `max_renders` renders or its process tree exceeds `max_rss_mb`,
+    waiting for the renders still in flight on its other pages to finish first.
+
+    Attributes:
+        pool_size (int): Number of pages kept open for concurrent renders.
+        max_renders (int): Renders served before the browser is recycled.
+        max_rss_mb (int): Resident memory ceiling of the browser process tree in MB.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, max_renders=DEFAULT_MAX_RENDERS, max_rss_mb=DEFAULT_MAX_RSS_MB):
+        self.pool_size = max(int(pool_size), 1)
+        self.max_renders = int(max_renders)
+        self.max_rss_mb = int(max_rss_mb)
+
+        self.lock = threading.Lock()
+        # notified whenever a render finishes, so a pending recycle can wait for the browser to go idle
+        self.idle = threading.Condition(self.lock)
+        self.active_renders = 0
+        self.process = None
+        self.pipe = None
+        self.pages = None
+        self.generation = 0
+        self.render_count = 0
+        self.recycle_requested = False
+
+    @classmethod
+    def from_config(cls, device_config):
+        """Creates a browser service using the browser settings in the device config."""
+        return cls(
+            pool_size=device_config.get_config("browser_pool_size", default=DEFAULT_POOL_SIZE),
+            max_renders=device_config.get_config("browser_max_renders", default=DEFAULT_MAX_RENDERS),
+            max_rss_mb=device_config.get_config("browser_max_rss_mb", default=DEFAULT_MAX_RSS_MB)
+        )
+
+    def is_running(self):
+        """Returns True if the browser process is alive and its pipe is open."""
+        return self.process is not None and self.process.poll() is None \
+            and self.pipe is not None and not self.pipe.closed.is_set()
+
+    def start(self):
+        """Starts the browser and opens the page pool if it is not already running."""
+        with self.lock:
+            if self.is_running():
+                return
+            self._shutdown_browser()
+            self._launch_browser()
+
+    def stop(self):
+        """Shuts the browser down."""
+        with self.lock:
+            self._shutdown_browser()
+
+    def screenshot(self, target, dimensions, timeout_ms=None):
+        """Renders the target (a file path or URL) at the given dimensions and returns a PIL image.
+
+        If timeout_ms is set, the page is captured once the timeout elapses even if it has not
+        finished loading, matching chromium's --timeout flag. Raises BrowserServiceError on failure.
+        """
+        with self.lock:
+            self._recycle_if_needed()
+            if not self.is_running():
+                self._shutdown_browser()
+                self._launch_browser()
+            generation = self.generation
+            pipe = self.pipe
+            pages = self.pages
+            self.active_renders += 1
+
+        session_id = None
+        try:
+            try:
+                session_id = pages.get(timeout=DEFAULT_RENDER_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise BrowserServiceError("No browser page available.")
+            image = self._render_page(pipe, session_id, target, dimensions, timeout_ms)
+        except BrowserServiceError:
+            with self.lock:
+                self.recycle_requested = True
+            raise
+        finally:
+            with self.lock:
+                # pages from a recycled browser are dropped along with their queue
+                if session_id is not None and generation == self.generation:
+                    pages.put(session_id)
+                self.active_renders -= 1
+                self.idle.notify_all()
+
+        with self.lock:
+            self.render_count += 1
+        return image
+
+    def get_status(self):
+        """Returns a dictionary describing the browser process for logging and diagnostics."""
+        return {
+            "running": self.is_running(),
+            "pid": self.process.pid if self.process else None,
+            "render_count": self.render_count,
+            "rss_mb": self._get_rss_mb(),
+            "generation": self.generation
+        }
+
+    def _render_page(self, pipe, session_id, target, dimensions, timeout_ms):
+        width, height = int(dimensions[0]), int(dimensions[1])
+        url = target
+        if os.path.exists(target):
+            url = Path(target).resolve().as_uri()
+
+        pipe.send("Emulation.setDeviceMetricsOverride", {
+            "width": width, "height": height, "deviceScaleFactor": 1, "mobile": False
+        }, session_id=session_id)
+
+        load_waiter = pipe.expect_event(session_id, "Page.loadEventFired")
+        result = pipe.send("Page.navigate", {"url": url}, session_id=session_id)
+        if result.get("errorText"):
+            pipe.wait_event(load_waiter, 0)
+            raise BrowserServiceError(f"Failed to load {url}: {result['errorText']}")
+
+        wait_seconds = timeout_ms / 1000 if timeout_ms else DEFAULT_RENDER_TIMEOUT_SECONDS
+        if not pipe.wait_event(load_waiter, wait_seconds):
+            if not timeout_ms:
+                raise BrowserServiceError(f"Timed out loading {url}.")
+            logger.info(f"Page did not finish loading within {timeout_ms} ms, capturing anyway.")
+            pipe.send("Page.stopLoading", session_id=session_id)
+
+        screenshot = pipe.send("Page.captureScreenshot", {
+            "format": "png",
+            "clip": {"x": 0, "y": 0, "width": width, "height": height, "scale": 1}
+        }, session_id=session_id)
+
+        with Image.open(BytesIO(base64.b64decode(screenshot["data"]))) as img:
+            image = img.copy()
+
+        # release the document so an idle page does not hold on to its memory
+        pipe.send("Page.navigate", {"url": "about:blank"}, session_id=session_id)
+        return image
+
+    def _launch_browser(self):
+        # chromium reads commands from fd 3 and writes responses to fd 4. Popen only places them as stdin and
+        # stdout without a preexec_fn, which is not safe with the app's threads, so a shell moves them to 3 and 4
+        if not shutil.which(CHROMIUM_BINARY):
+            raise BrowserServiceError(f"Failed to start {CHROMIUM_BINARY}: not found on PATH.")
+        to_browser_read, to_browser_write = os.pipe()
+        from_browser_read, from_browser_write = os.pipe()
+
+        logger.info("Starting persistent browser service")
+        try:
+            self.process = subprocess.Popen(
+                ["sh", "-c", PIPE_FD_WRAPPER, "sh", CHROMIUM_BINARY, *CHROMIUM_ARGS, "about:blank"],
+                stdin=to_browser_read, stdout=from_browser_write, stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            raise BrowserServiceError(f"Failed to start {CHROMIUM_BINARY}: {e}")
+        finally:
+            os.close(to_browser_read)
+            os.close(from_browser_write)
+
+        self.pipe = DevToolsPipe(from_browser_read, to_browser_write)
+        self.generation += 1
+        self.render_count = 0
+        self.recycle_requested = False
+        self.pages = queue.Queue()
+
+        try:
+            for _ in range(self.pool_size):
+                target = self.pipe.send("Target.createTarget", {"url": "about:blank"})
+                session = self.pipe.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+                self.pipe.send("Page.enable", session_id=session["sessionId"])
+                self.pages.put(session["sessionId"])
+        except BrowserServiceError:
+            self._shutdown_browser()
+            raise
+
+        logger.info(f"Browser service started. | pid: {self.process.pid} | pages: {self.pool_size}")
+
+    def _shutdown_browser(self):
+        if self.pipe:
+            try:
+                if self.is_running():
+                    self.pipe.send("Browser.close", timeout=5)
+            except BrowserServiceError:
+                pass
+            self.pipe.close()
+            self.pipe = None
+
+        if self.process:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            logger.info(f"Browser service stopped. | pid: {self.process.pid}")
+            self.process = None
+
+    def _recycle_if_needed(self):
+        """Memory watchdog, recycles the browser after too many renders or above the RSS ceiling.
+
+        Must hold the lock. Once a recycle is due no new render starts, and the browser is only stopped
+        when the renders in flight on its other pages have finished.
+        """
+        while True:
+            reason = self._get_recycle_reason()
+            if not reason:
+                return
+            if self.active_renders == 0:
+                logger.info(f"Recycling browser service, {reason}.")
+                self._shutdown_browser()
+                return
+            self.idle.wait()
+
+    def _get_recycle_reason(self):
+        if not self.process:
+            return None
+
+        rss_mb = self._get_rss_mb()
+        if self.recycle_requested:
+            return "previous render failed"
+        if self.max_renders and self.render_count >= self.max_renders:
+            return f"served {self.render_count} renders"
+        if self.max_rss_mb and rss_mb and rss_mb > self.max_rss_mb:
+            return f"rss {rss_mb:.0f} MB exceeds {self.max_rss_mb} MB"
+        return None
+
+    def _get_rss_mb(self):
+        if not self.process or self.process.poll() is not None:
+            return None
+        try:
+            process = psutil.Process(self.process.pid)
+            rss = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return rss / (1024 * 1024)
+        except psutil.Error:
+            return None
+
+def get_browser_service():
+    """Returns the browser service registered by the app, or None if HTML renders use one-shot processes."""
+    return _browser_service
+
+def set_browser_service(service):
+    """Registers the browser service used by take_screenshot, pass None to unregister it."""
+    global _browser_service
+    _browser_service = service
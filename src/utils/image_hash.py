@@ -0,0 +1,35 @@
+import hashlib
+from PIL import Image, ImageChops
+
+# side in pixels of the square tiles compared by get_change_score
+DEFAULT_TILE_SIZE = 16
+# difference in mean tile brightness ignored as noise, out of 255
+TILE_TOLERANCE = 2
+
+def compute_image_hash(image):
+    """Computes a BLAKE2b hash of the image's raw pixel buffer, its mode and size.
+
+    The pixels are hashed in the image's own mode, without converting it to RGB first.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def compute_tile_signature(image, tile_size=DEFAULT_TILE_SIZE):
+    """Returns the mean brightness of each tile of the image, as a small grayscale image."""
+    gray = image.convert("L")
+    width, height = gray.size
+    grid = (max(-(-width // tile_size), 1), max(-(-height // tile_size), 1))
+    return gray.resize(grid, Image.BOX)
+
+def get_change_score(previous_signature, signature):
+    """Returns the share of tiles, from 0 to 1, whose brightness changed between two tile signatures.
+
+    Returns 1 if there is no previous signature or the signatures are of differently sized images.
+    """
+    if previous_signature is None or previous_signature.size != signature.size:
+        return 1.0
+    histogram = ImageChops.difference(previous_signature, signature).histogram()
+    changed = sum(histogram[TILE_TOLERANCE + 1:])
+    return changed / (signature.size[0] * signature.size[1])
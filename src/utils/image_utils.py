@@ -3,12 +3,23 @@ from PIL import Image, ImageEnhance
 from io import BytesIO
 import os
 import logging
-import hashlib
 import tempfile
 import subprocess
+from utils.browser_service import get_browser_service, BrowserServiceError
 
 logger = logging.getLogger(__name__)
 
+# single transpose for the orientation rotation combined with the inversion, by counterclockwise angle
+TRANSPOSE_BY_ANGLE = {
+    90: Image.Transpose.ROTATE_90,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_270
+}
+
+# modes brightness and contrast can be applied to with a lookup table per band
+LUT_MODES = ("L", "RGB", "RGBA")
+IDENTITY_LUT = list(range(256))
+
 def get_image(image_url):
     response = requests.get(image_url)
     img = None
@@ -30,10 +41,23 @@ def change_orientation(image, orientation, inverted=False):
     return image.rotate(angle, expand=1)
 
 def resize_image(image, desired_size, image_settings=[]):
-    img_width, img_height = image.size
     desired_width, desired_height = desired_size
     desired_width, desired_height = int(desired_width), int(desired_height)
 
+    # Step 1: Crop the image to the desired aspect ratio
+    image = image.crop(get_crop_box(image.size, (desired_width, desired_height), image_settings))
+
+    # Step 2: Resize to the exact desired dimensions (if necessary)
+    return image.resize((desired_width, desired_height), Image.LANCZOS)
+
+def get_crop_box(image_size, desired_size, image_settings=[]):
+    """Returns the (left, upper, right, lower) box that crops an image of image_size to the aspect ratio of desired_size.
+
+    The box is centered unless image_settings contains 'keep-width', then it starts at the top left corner.
+    """
+    img_width, img_height = image_size
+    desired_width, desired_height = desired_size
+
     img_ratio = img_width / img_height
     desired_ratio = desired_width / desired_height
 
@@ -41,8 +65,6 @@ def resize_image(image, desired_size, image_settings=[]):
 
     x_offset, y_offset = 0,0
     new_width, new_height = img_width,img_height
-    # Step 1: Determine crop dimensions
-    desired_ratio = desired_width / desired_height
     if img_ratio > desired_ratio:
         # Image is wider than desired aspect ratio
         new_width = int(img_height * desired_ratio)
@@ -54,33 +76,84 @@ def resize_image(image, desired_size, image_settings=[]):
         if not keep_width:
             y_offset = (img_height - new_height) // 2
 
-    # Step 2: Crop the image
-    image = image.crop((x_offset, y_offset, x_offset + new_width, y_offset + new_height))
+    return (x_offset, y_offset, x_offset + new_width, y_offset + new_height)
 
-    # Step 3: Resize to the exact desired dimensions (if necessary)
-    return image.resize((desired_width, desired_height), Image.LANCZOS)
+def transform_image(image, desired_size, orientation="horizontal", inverted=False, image_settings=[]):
+    """Orients, crops, resizes and inverts an image for the display with one resample and at most one transpose.
 
-def apply_image_enhancement(img, image_settings={}):
+    Gives the same result as change_orientation, resize_image and rotate(180) applied in turn, but the crop is
+    passed to resize as its source box and the rotations are combined, so no full-size intermediate copies are made.
+    """
+    desired_width, desired_height = int(desired_size[0]), int(desired_size[1])
+    img_width, img_height = image.size
+    vertical = orientation == "vertical"
+
+    if vertical:
+        # crop in the frame rotated 90 degrees counterclockwise, then map the box back onto the image
+        left, upper, right, lower = get_crop_box((img_height, img_width), (desired_width, desired_height), image_settings)
+        box = (img_width - lower, left, img_width - upper, right)
+        size = (desired_height, desired_width)
+    else:
+        box = get_crop_box((img_width, img_height), (desired_width, desired_height), image_settings)
+        size = (desired_width, desired_height)
 
-    # Apply Brightness
-    img = ImageEnhance.Brightness(img).enhance(image_settings.get("brightness", 1.0))
+    if size != (img_width, img_height) or box != (0, 0, img_width, img_height):
+        image = image.resize(size, Image.LANCZOS, box=box)
 
-    # Apply Contrast
-    img = ImageEnhance.Contrast(img).enhance(image_settings.get("contrast", 1.0))
+    angle = (90 if vertical else 0) + (180 if inverted else 0)
+    if angle:
+        image = image.transpose(TRANSPOSE_BY_ANGLE[angle])
+    return image
+
+def apply_image_enhancement(img, image_settings={}):
+    """Applies the brightness, contrast, saturation and sharpness factors, skipping those left at 1.0.
+
+    Brightness and contrast are combined into a single lookup table for the image modes it supports.
+    """
+    image_settings = image_settings or {}
+    brightness = float(image_settings.get("brightness", 1.0))
+    contrast = float(image_settings.get("contrast", 1.0))
+    saturation = float(image_settings.get("saturation", 1.0))
+    sharpness = float(image_settings.get("sharpness", 1.0))
+
+    if brightness != 1.0 or contrast != 1.0:
+        if img.mode in LUT_MODES:
+            lut = get_brightness_contrast_lut(img, brightness, contrast)
+            # the alpha channel, if any, is left unchanged like ImageEnhance does
+            img = img.point(lut * len(img.mode.replace("A", "")) + (IDENTITY_LUT if "A" in img.mode else []))
+        else:
+            # Apply Brightness
+            img = ImageEnhance.Brightness(img).enhance(brightness)
+
+            # Apply Contrast
+            img = ImageEnhance.Contrast(img).enhance(contrast)
 
     # Apply Saturation (Color)
-    img = ImageEnhance.Color(img).enhance(image_settings.get("saturation", 1.0))
+    if saturation != 1.0:
+        img = ImageEnhance.Color(img).enhance(saturation)
 
     # Apply Sharpness
-    img = ImageEnhance.Sharpness(img).enhance(image_settings.get("sharpness", 1.0))
+    if sharpness != 1.0:
+        img = ImageEnhance.Sharpness(img).enhance(sharpness)
 
     return img
 
-def compute_image_hash(image):
-    """Compute SHA-256 hash of an image."""
-    image = image.convert("RGB")
-    img_bytes = image.tobytes()
-    return hashlib.sha256(img_bytes).hexdigest()
+def get_brightness_contrast_lut(img, brightness, contrast):
+    """Returns the 256 entry lookup table of ImageEnhance.Brightness followed by ImageEnhance.Contrast for the image.
+
+    Contrast blends with the mean gray level of the brightened image, which is computed from the grayscale
+    histogram of the original image rather than by brightening it first.
+    """
+    brightened = [_clip(value * brightness) for value in range(256)]
+
+    histogram = img.convert("L").histogram()[:256]
+    pixels = sum(histogram) or 1
+    mean = int(sum(brightened[value] * count for value, count in enumerate(histogram)) / pixels + 0.5)
+
+    return [_clip(mean + contrast * (value - mean)) for value in brightened]
+
+def _clip(value):
+    return min(max(int(value), 0), 255)
 
 def take_screenshot_html(html_str, dimensions, timeout_ms=None):
     image = None
@@ -101,6 +174,18 @@ def take_screenshot_html(html_str, dimensions, timeout_ms=None):
     return image
 
 def take_screenshot(target, dimensions, timeout_ms=None):
+    """Screenshots a file path or URL, using the persistent browser service when one is running."""
+    browser_service = get_browser_service()
+    if browser_service:
+        try:
+            return browser_service.screenshot(target, dimensions, timeout_ms)
+        except BrowserServiceError as e:
+            logger.warning(f"Browser service failed, falling back to one-shot browser: {str(e)}")
+
+    return take_screenshot_subprocess(target, dimensions, timeout_ms)
+
+def take_screenshot_subprocess(target, dimensions, timeout_ms=None):
+    """Screenshots a file path or URL by starting a new chromium process for this render only."""
     image = None
     try:
         # Create a temporary output file for the screenshot
@@ -0,0 +1,133 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# upper bounds in seconds, from hashing an image to slow plugin renders
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REGISTRY = []
+
+class Counter:
+    """Monotonically increasing count, exported in the Prometheus text format.
+
+    Attributes:
+        name (str): Metric name.
+        documentation (str): Help text.
+        labelnames (tuple): Names of the labels every sample has.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        """Increments the counter for the given label values."""
+        key = _label_values(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Returns the current value for the given label values."""
+        with self.lock:
+            return self.values.get(_label_values(self.labelnames, labels), 0)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Distribution of observed durations in cumulative buckets, exported in the Prometheus text format.
+
+    Attributes:
+        name (str): Metric name.
+        documentation (str): Help text.
+        labelnames (tuple): Names of the labels every sample has.
+        buckets (tuple): Sorted bucket upper bounds, +Inf is implied.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        """Records one observation for the given label values."""
+        key = _label_values(self.labelnames, labels)
+        with self.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager observing how long its block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames + ('le',), key + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+def generate_latest():
+    """Returns all registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+def _label_values(labelnames, labels):
+    return tuple(str(labels.get(name) or "") for name in labelnames)
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return "{" + ",".join(pairs) + "}"
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# metrics of the refresh pipeline, labelled by the plugin being refreshed
+PLUGIN_RENDER_SECONDS = Histogram(
+    "inkypi_plugin_render_seconds", "Time spent in plugin generate_image.", ("plugin_id", "plugin_instance"))
+PLUGIN_RENDERS_TOTAL = Counter(
+    "inkypi_plugin_renders_total", "Plugin images generated, by result.", ("plugin_id", "plugin_instance", "result"))
+REFRESH_STAGE_SECONDS = Histogram(
+    "inkypi_refresh_stage_seconds", "Time spent in each stage of a display refresh.", ("stage", "plugin_id", "plugin_instance"))
+REFRESHES_TOTAL = Counter(
+    "inkypi_refreshes_total", "Display refreshes, by result.", ("plugin_id", "plugin_instance", "result"))
+
+# metrics of the e-paper panel, labelled by its display type
+DISPLAY_UPDATES_TOTAL = Counter(
+    "inkypi_display_updates_total", "Panel updates, by refresh mode.", ("display_type", "mode"))
+DISPLAY_CLEARS_TOTAL = Counter(
+    "inkypi_display_clears_total", "Panel Clear() cycles, by the budget that ran out.", ("display_type", "reason"))
+DISPLAY_INITS_TOTAL = Counter(
+    "inkypi_display_inits_total", "Panel init() calls, sent or skipped because the panel was awake.", ("display_type", "result"))
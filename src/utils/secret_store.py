@@ -0,0 +1,87 @@
+import os
+import logging
+import threading
+from dotenv import dotenv_values, find_dotenv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_SECONDS = 30
+
+class SecretStore:
+    """In-memory cache of the secrets in the .env file.
+
+    The file is parsed once and re-parsed only when its inode or modification time changes, which a
+    background thread checks every poll_seconds, so looking up a secret never touches the filesystem.
+    Keys missing from the file fall back to the process environment.
+
+    Attributes:
+        path (str): The .env file, found the same way load_dotenv finds it if not given.
+        poll_seconds (float): Time between checks of the file for changes.
+        values (dict): The parsed secrets.
+    """
+
+    def __init__(self, path=None, poll_seconds=DEFAULT_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = max(float(poll_seconds), 1)
+        self.lock = threading.Lock()
+        self.values = {}
+        self.file_id = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.reload()
+
+    def get(self, key):
+        """Returns the secret for the key, or None if it is not set."""
+        values = self.values
+        if key in values:
+            return values[key]
+        return os.environ.get(key)
+
+    def get_all(self):
+        """Returns a copy of the cached secrets, e.g. to pass to a worker process."""
+        return dict(self.values)
+
+    def reload(self, force=True):
+        """Re-parses the .env file, or only if it changed since the last parse when force is False."""
+        with self.lock:
+            path = self.path or find_dotenv()
+            file_id = _get_file_id(path)
+            if not force and file_id == self.file_id:
+                return False
+            # replaced as a whole, so readers without the lock see either the old or the new secrets
+            self.values = dotenv_values(path) if file_id else {}
+            self.file_id = file_id
+        logger.debug(f"Loaded secrets. | path: {path}, keys: {len(self.values)}")
+        return True
+
+    def start(self):
+        """Starts the thread checking the .env file for changes."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the thread checking the .env file for changes."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.poll_seconds):
+            try:
+                if self.reload(force=False):
+                    logger.info("Secrets file changed, reloaded secrets.")
+            except Exception:
+                logger.exception("Failed to reload secrets")
+
+def _get_file_id(path):
+    """Returns the inode, modification time and size of the file, or None if it does not exist."""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
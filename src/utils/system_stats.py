@@ -0,0 +1,108 @@
+import os
+import time
+import logging
+import threading
+import psutil
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 10
+DEFAULT_WINDOW_SIZE = 360
+
+THERMAL_ZONE_FILE = "/sys/class/thermal/thermal_zone0/temp"
+
+class SystemStatsSampler:
+    """Samples system stats on a background thread into a fixed-size ring buffer.
+
+    CPU usage is measured between consecutive samples, so taking a sample never blocks, and network
+    counters are reported as deltas since the previous sample.
+
+    Attributes:
+        interval_seconds (float): Time between samples.
+        samples (deque): The most recent samples, oldest first.
+    """
+
+    def __init__(self, interval_seconds=DEFAULT_INTERVAL_SECONDS, window_size=DEFAULT_WINDOW_SIZE):
+        self.interval_seconds = max(float(interval_seconds), 1)
+        self.samples = deque(maxlen=max(int(window_size), 1))
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_net_io = None
+
+    @classmethod
+    def from_config(cls, device_config):
+        """Creates a sampler using the system_stats_* settings from the device config."""
+        return cls(
+            interval_seconds=device_config.get_config("system_stats_interval_seconds", default=DEFAULT_INTERVAL_SECONDS),
+            window_size=device_config.get_config("system_stats_window_size", default=DEFAULT_WINDOW_SIZE)
+        )
+
+    def start(self):
+        """Starts the sampling thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        logger.info(f"Starting system stats sampler. | interval_seconds: {self.interval_seconds}")
+        self.stop_event.clear()
+        # prime the counters so the first sample has a meaningful cpu percent and network delta
+        psutil.cpu_percent(interval=None)
+        self.last_net_io = psutil.net_io_counters()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the sampling thread."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def get_latest(self):
+        """Returns the most recent sample, or None if nothing has been sampled yet."""
+        with self.lock:
+            return self.samples[-1] if self.samples else None
+
+    def get_samples(self, since=None):
+        """Returns the buffered samples, optionally only those taken after the since timestamp."""
+        with self.lock:
+            samples = list(self.samples)
+        if since is not None:
+            samples = [sample for sample in samples if sample["timestamp"] > since]
+        return samples
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval_seconds):
+            try:
+                sample = self.sample()
+                with self.lock:
+                    self.samples.append(sample)
+            except Exception:
+                logger.exception("Failed to sample system stats")
+
+    def sample(self):
+        """Takes a sample without blocking."""
+        net_io = psutil.net_io_counters()
+        last_net_io = self.last_net_io or net_io
+        self.last_net_io = net_io
+
+        return {
+            'timestamp': time.time(),
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': psutil.virtual_memory().percent,
+            'disk_percent': psutil.disk_usage('/').percent,
+            'load_avg_1_5_15': os.getloadavg(),
+            'swap_percent': psutil.swap_memory().percent,
+            'temperature_c': get_cpu_temperature(),
+            'net_io': {
+                'bytes_sent': net_io.bytes_sent - last_net_io.bytes_sent,
+                'bytes_recv': net_io.bytes_recv - last_net_io.bytes_recv
+            }
+        }
+
+def get_cpu_temperature():
+    """Returns the CPU temperature in degrees Celsius, or None if it is not available."""
+    try:
+        with open(THERMAL_ZONE_FILE) as f:
+            return round(int(f.read().strip()) / 1000, 1)
+    except (OSError, ValueError):
+        return None